@@ -6,6 +6,7 @@ Plugin for updating your local TradeDangerous database.
 
 import logging
 import os
+import time
 import tkinter as tk
 from tkinter import ttk
 import tkinter.filedialog
@@ -15,7 +16,13 @@ from ttkHyperlinkLabel import HyperlinkLabel
 from config import appname, config
 from companion import CAPIData, SERVER_LIVE
 
-from tradedb import TradeDB, import_standard_data, fill_RareItem_cache, load_fdev_name_mapping
+from tradedb import (
+    TradeDB, TradeDBWriter, TradeDBFanout, Maintenance, StatementProfiler, import_standard_data, fill_RareItem_cache,
+    load_fdev_name_mapping,
+)
+from tradedb.events import Action, journal_actions, capi_actions
+from tradedb.journalfiles import CompanionReader, COMPANION_EVENTS
+from tradedb.const import SYSTEM_CACHE_SIZE, STATION_CACHE_SIZE, BUSY_TIMEOUT_MS, LOCK_RETRIES, STOP_TIMEOUT_S
 
 PLUGIN_NAME = os.path.basename(os.path.dirname(__file__))
 logger = logging.getLogger(f"{appname}.{PLUGIN_NAME}")
@@ -27,6 +34,27 @@ PLUGIN_URL = "https://github.com/bgol/UpdateTD"
 PREFSNAME_DBFILENAME = "updatetd_dbfilename"
 PREFSNAME_CREATE_ = "updatetd_create_"
 PREFSNAME_USE_RAREITEM_CACHE = "updatetd_use_rareitem_cache"
+PREFSNAME_DIFF_UPDATE = "updatetd_diff_update"
+PREFSNAME_TOUCH_UNCHANGED = "updatetd_touch_unchanged"
+# no UI, tuning only
+PREFSNAME_SYSTEM_CACHE_SIZE = "updatetd_system_cache_size"
+PREFSNAME_STATION_CACHE_SIZE = "updatetd_station_cache_size"
+PREFSNAME_SLOW_QUERY_MS = "updatetd_slow_query_ms"
+PREFSNAME_EXPLAIN_SLOW_QUERY = "updatetd_explain_slow_query"
+PREFSNAME_PROFILE_REPORT = "updatetd_profile_report"
+PREFSNAME_BUSY_TIMEOUT_MS = "updatetd_busy_timeout_ms"
+PREFSNAME_LOCK_RETRIES = "updatetd_lock_retries"
+PREFSNAME_CACHE_SIZE_KIB = "updatetd_cache_size_kib"
+PREFSNAME_MMAP_SIZE_MB = "updatetd_mmap_size_mb"
+PREFSNAME_CHECKPOINT_IDLE_S = "updatetd_checkpoint_idle_s"
+PREFSNAME_WAL_LIMIT_MB = "updatetd_wal_limit_mb"
+PREFSNAME_CREATE_INDEXES = "updatetd_create_indexes"
+PREFSNAME_COALESCE_MS = "updatetd_coalesce_ms"
+PREFSNAME_STOP_TIMEOUT_S = "updatetd_stop_timeout_s"
+# additional databases, updated from the same events
+PREFSNAME_EXTRA_DBFILENAMES = "updatetd_extra_dbfilenames"
+PREFSNAME_EXTRA_QUEUE_SIZE = "updatetd_extra_queue_size"
+PROFILE_REPORT_FILENAME = "profile_report.json"
 
 class This:
     """Module global variables."""
@@ -35,14 +63,22 @@ class This:
     db_filename: str = None
     prefs_db_filename: tk.StringVar = None
     tradedb: TradeDB = None
+    writer: TradeDBWriter = None
+    fanout: TradeDBFanout = None
+    companion_reader: CompanionReader = None
+    extra_db_filenames: list[str] = []
     create_item: bool = True
     create_ship: bool = True
     create_module: bool = False
     use_rareitem_cache: bool = False
+    diff_update: bool = False
+    touch_unchanged: bool = True
     prefs_create_item: tk.BooleanVar = None
     prefs_create_ship: tk.BooleanVar = None
     prefs_create_module: tk.BooleanVar = None
     prefs_use_rareitem_cache: tk.BooleanVar = None
+    prefs_diff_update: tk.BooleanVar = None
+    prefs_touch_unchanged: tk.BooleanVar = None
 
     def __str__(self) -> str:
         return ("\n".join(line for line in ("",
@@ -50,10 +86,14 @@ class This:
             f"{self.default_db_filename = }",
             f"{self.db_filename = }",
             f"{self.tradedb = }",
+            f"{self.writer = }",
+            f"{self.extra_db_filenames = }",
             f"{self.create_item = }",
             f"{self.create_ship = }",
             f"{self.create_module = }",
             f"{self.use_rareitem_cache = }",
+            f"{self.diff_update = }",
+            f"{self.touch_unchanged = }",
         )))
 
 this = This()
@@ -68,23 +108,79 @@ def plugin_start3(plugin_dir: str) -> str:
     this.create_ship = config.get_bool(f"{PREFSNAME_CREATE_}ship", default=True)
     this.create_module = config.get_bool(f"{PREFSNAME_CREATE_}module", default=False)
     this.use_rareitem_cache = config.get_bool(PREFSNAME_USE_RAREITEM_CACHE, default=False)
+    this.diff_update = config.get_bool(PREFSNAME_DIFF_UPDATE, default=False)
+    this.touch_unchanged = config.get_bool(PREFSNAME_TOUCH_UNCHANGED, default=True)
     this.prefs_db_filename = tk.StringVar(value = this.db_filename)
     this.prefs_create_item = tk.BooleanVar(value = this.create_item)
     this.prefs_create_ship = tk.BooleanVar(value = this.create_ship)
     this.prefs_create_module = tk.BooleanVar(value = this.create_module)
     this.prefs_use_rareitem_cache = tk.BooleanVar(value = this.use_rareitem_cache)
-    this.tradedb = TradeDB(
-        logger, this.db_filename, this.create_item,
-        this.create_ship, this.create_module, this.use_rareitem_cache
-    )
-    fill_RareItem_cache(this.tradedb, this.plugin_dir)
-    load_fdev_name_mapping(this.tradedb, this.plugin_dir)
+    this.prefs_diff_update = tk.BooleanVar(value = this.diff_update)
+    this.prefs_touch_unchanged = tk.BooleanVar(value = this.touch_unchanged)
+    this.extra_db_filenames = config.get_list(PREFSNAME_EXTRA_DBFILENAMES, default=[])
+    extra_queue_size = config.get_int(PREFSNAME_EXTRA_QUEUE_SIZE, default=1000)
+    coalesce_ms = config.get_int(PREFSNAME_COALESCE_MS, default=1000)
+    this.fanout = TradeDBFanout(logger)
+    tdb = new_tradedb(logger, this.db_filename)
+    this.fanout.add_target("main", tdb, maintenance=new_maintenance(tdb), coalesce_ms=coalesce_ms)
+    for db_filename in this.extra_db_filenames:
+        target_name = os.path.splitext(os.path.basename(db_filename))[0]
+        tdb = new_tradedb(logger.getChild(target_name), db_filename)
+        this.fanout.add_target(target_name, tdb, extra_queue_size, new_maintenance(tdb), coalesce_ms)
+    this.companion_reader = CompanionReader(logger, submit_companion_actions)
+    this.tradedb = this.fanout.primary.tdb
+    this.writer = this.fanout.primary.writer
+    # only the writer threads touch the databases, connecting and loading included
+    this.fanout.start()
+    this.fanout.open(setup_tradedb)
+    this.companion_reader.start()
     logger.debug(f"{this = !s}")
 
     return PLUGIN_NAME
 
+def new_tradedb(tdb_logger: logging.Logger, db_filename: str) -> TradeDB:
+    return TradeDB(
+        tdb_logger, db_filename, this.create_item,
+        this.create_ship, this.create_module, this.use_rareitem_cache, this.diff_update,
+        system_cache_size = config.get_int(PREFSNAME_SYSTEM_CACHE_SIZE, default=SYSTEM_CACHE_SIZE),
+        station_cache_size = config.get_int(PREFSNAME_STATION_CACHE_SIZE, default=STATION_CACHE_SIZE),
+        profiler = StatementProfiler(
+            slow_ms = config.get_int(PREFSNAME_SLOW_QUERY_MS, default=100),
+            explain = config.get_bool(PREFSNAME_EXPLAIN_SLOW_QUERY, default=False),
+        ),
+        touch_unchanged = this.touch_unchanged,
+        busy_timeout_ms = config.get_int(PREFSNAME_BUSY_TIMEOUT_MS, default=BUSY_TIMEOUT_MS),
+        lock_retries = config.get_int(PREFSNAME_LOCK_RETRIES, default=LOCK_RETRIES),
+        cache_size_kib = config.get_int(PREFSNAME_CACHE_SIZE_KIB, default=0) or None,
+        mmap_size = config.get_int(PREFSNAME_MMAP_SIZE_MB, default=0) * 2**20 or None,
+        create_indexes = config.get_bool(PREFSNAME_CREATE_INDEXES, default=False),
+        connect = False,
+    )
+
+def setup_tradedb(tdb: TradeDB) -> None:
+    fill_RareItem_cache(tdb, this.plugin_dir)
+    load_fdev_name_mapping(tdb, this.plugin_dir)
+
+def new_maintenance(tdb: TradeDB) -> Maintenance:
+    return Maintenance(
+        tdb, tdb.logger,
+        idle_s = config.get_int(PREFSNAME_CHECKPOINT_IDLE_S, default=30),
+        wal_limit_bytes = config.get_int(PREFSNAME_WAL_LIMIT_MB, default=64) * 2**20,
+    )
+
 def plugin_stop() -> None:
-    this.tradedb.close()
+    stop_timeout = config.get_int(PREFSNAME_STOP_TIMEOUT_S, default=STOP_TIMEOUT_S)
+    deadline = time.monotonic() + stop_timeout
+    # the actions of the files read until now still reach the writers
+    this.companion_reader.stop(stop_timeout)
+    # the writers are daemon threads, EDMC may exit while one still waits for a lock
+    this.fanout.stop(max(0.0, deadline - time.monotonic()))
+    this.fanout.log_profiles()
+    if config.get_bool(PREFSNAME_PROFILE_REPORT, default=False):
+        report_filename = os.path.join(this.plugin_dir, PROFILE_REPORT_FILENAME)
+        logger.info(f"write profile report {report_filename!r}")
+        this.fanout.dump_profiles(report_filename)
+    this.fanout.close()
 
 def filedialog(parent: nb.Frame, title: str, pathvar: tk.StringVar) -> None:
     filename = tkinter.filedialog.askopenfilename(
@@ -101,14 +197,25 @@ def filedialog(parent: nb.Frame, title: str, pathvar: tk.StringVar) -> None:
     if filename:
         pathvar.set(filename)
 
-def import_data_button() -> None:
-    db_filename = this.prefs_db_filename.get()
+def import_data(db_filename: str) -> None:
     this.tradedb.change_settings(db_filename, True, True, True, False)
     import_standard_data(this.tradedb, this.plugin_dir)
     this.tradedb.change_settings(
         this.db_filename, this.create_item, this.create_ship,
-        this.create_module, this.use_rareitem_cache
+        this.create_module, this.use_rareitem_cache, this.diff_update, this.touch_unchanged
+    )
+
+def import_data_button() -> None:
+    this.writer.submit("Import", import_data, this.prefs_db_filename.get())
+
+def apply_settings(tdb: TradeDB) -> None:
+    # the extra databases are not selectable in the settings dialog
+    db_filename = this.db_filename if tdb is this.tradedb else tdb.db_filename
+    tdb.change_settings(
+        db_filename, this.create_item, this.create_ship,
+        this.create_module, this.use_rareitem_cache, this.diff_update, this.touch_unchanged
     )
+    fill_RareItem_cache(tdb, this.plugin_dir)
 
 def plugin_prefs(parent: nb.Notebook, cmdr: str, is_beta: bool) -> tk.Frame:
     # EDMC defaults
@@ -153,15 +260,23 @@ def plugin_prefs(parent: nb.Notebook, cmdr: str, is_beta: bool) -> tk.Frame:
         frame, text='Use RareItem cache (insert known RareItems of a station when docking)',
         variable=this.prefs_use_rareitem_cache
     ).grid(row=8, column=2, columnspan=2, padx=PADX, pady=PADY, sticky=tk.W)
+    nb.Checkbutton(
+        frame, text='Only write changed market/shipyard/outfitting rows (unchanged rows keep their timestamp)',
+        variable=this.prefs_diff_update
+    ).grid(row=9, column=2, columnspan=2, padx=PADX, pady=PADY, sticky=tk.W)
+    nb.Checkbutton(
+        frame, text='Refresh the timestamps of an unchanged market/shipyard/outfitting',
+        variable=this.prefs_touch_unchanged
+    ).grid(row=10, column=2, columnspan=2, padx=PADX, pady=PADY, sticky=tk.W)
 
-    ttk.Separator(frame, orient=tk.HORIZONTAL).grid(row=9, column=1, columnspan=3, padx=PADX, pady=PADY, sticky=tk.EW)
+    ttk.Separator(frame, orient=tk.HORIZONTAL).grid(row=11, column=1, columnspan=3, padx=PADX, pady=PADY, sticky=tk.EW)
 
     nb.Button(
         frame, text="Import", command=import_data_button
-    ).grid(row=10, column=1, padx=2*PADX, pady=(0, PADY), sticky=tk.E)
+    ).grid(row=12, column=1, padx=2*PADX, pady=(0, PADY), sticky=tk.E)
     nb.Label(
         frame, text="Import standard values for Categories, Items, Ships and Upgrades"
-    ).grid(row=10, column=2, padx=PADX, pady=(0, PADY), sticky=tk.W)
+    ).grid(row=12, column=2, padx=PADX, pady=(0, PADY), sticky=tk.W)
 
     return frame
 
@@ -171,16 +286,16 @@ def prefs_changed(cmdr: str, is_beta: bool) -> None:
     this.create_ship = this.prefs_create_ship.get()
     this.create_module = this.prefs_create_module.get()
     this.use_rareitem_cache = this.prefs_use_rareitem_cache.get()
+    this.diff_update = this.prefs_diff_update.get()
+    this.touch_unchanged = this.prefs_touch_unchanged.get()
     config.set(PREFSNAME_DBFILENAME, this.db_filename)
     config.set(f"{PREFSNAME_CREATE_}item", this.create_item)
     config.set(f"{PREFSNAME_CREATE_}ship", this.create_ship)
     config.set(f"{PREFSNAME_CREATE_}module", this.create_module)
     config.set(PREFSNAME_USE_RAREITEM_CACHE, this.use_rareitem_cache)
-    this.tradedb.change_settings(
-        this.db_filename, this.create_item, this.create_ship,
-        this.create_module, this.use_rareitem_cache
-    )
-    fill_RareItem_cache(this.tradedb, this.plugin_dir)
+    config.set(PREFSNAME_DIFF_UPDATE, this.diff_update)
+    config.set(PREFSNAME_TOUCH_UNCHANGED, this.touch_unchanged)
+    this.fanout.submit("Settings", apply_settings)
     logger.debug(f"{this = !s}")
 
 def journal_entry(
@@ -190,26 +305,25 @@ def journal_entry(
         logger.info("Beta game ignored.")
         return
 
-    if not this.tradedb.is_connected:
+    if not this.fanout.is_usable:
         logger.info("Database not connected.")
         return
 
-    if entry["event"] in {"FSDJump", "Location", "CarrierJump"}:
-        logger.info("Check system data from Jump / Location.")
-        this.tradedb.update_system(entry, cmdrname)
-        if entry["event"] == "Location" and entry.get("Docked", False):
-            logger.info("Check station data from Location.")
-            this.tradedb.update_station(entry)
-    elif entry["event"] == "NavRoute":
-        logger.info("Check system data from NavRoute.")
-        for route in entry.get("Route", []):
-            this.tradedb.update_system({"timestamp": entry["timestamp"], **route}, cmdrname)
-    elif entry["event"] == "Docked":
-        logger.info("Check station data from Docked.")
-        this.tradedb.update_station(entry)
-    elif entry["event"] == "ColonisationConstructionDepot":
-        logger.info("Update construction depot data from Journal.")
-        this.tradedb.update_construction_depot(entry)
+    # Market.json, Shipyard.json and Outfitting.json, not waiting for the CAPI
+    if entry["event"] in COMPANION_EVENTS:
+        journal_dir = config.get_str("journaldir") or config.default_journal_dir
+        this.companion_reader.submit(journal_dir, entry, cmdrname)
+        return
+    submit_actions(journal_actions(entry, cmdrname))
+
+def submit_companion_actions(data: dict, cmdrname: str) -> None:
+    """runs on the companion reader thread"""
+    submit_actions(journal_actions(data, cmdrname))
+
+def submit_actions(actions: list[Action]) -> None:
+    for action in actions:
+        logger.info(action.info)
+        this.fanout.submit_action(action)
 
 def cmdr_data(data: CAPIData, is_beta: bool) -> None:
     """
@@ -219,16 +333,9 @@ def cmdr_data(data: CAPIData, is_beta: bool) -> None:
         logger.info("Beta game ignored.")
         return
 
-    if not this.tradedb.is_connected:
+    if not this.fanout.is_usable:
         logger.info("Database not connected.")
         return
 
     if data.source_host == SERVER_LIVE and "lastStarport" in data:
-        if "requiredConstructionResources" in data["lastStarport"]:
-            logger.info("Update construction depot data from CAPI.")
-            this.tradedb.update_construction_depot(data["lastStarport"])
-        else:
-            logger.info("Update starport data.")
-            this.tradedb.update_market(data["lastStarport"])
-            this.tradedb.update_shipyard(data["lastStarport"])
-            this.tradedb.update_outfitting(data["lastStarport"])
+        submit_actions(capi_actions(data["lastStarport"]))
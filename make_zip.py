@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import sys
+
 from zipfile import ZipFile, ZIP_DEFLATED
 
+sys.path.insert(0, "tools")
+import edmc_stub
+edmc_stub.install()
+
+from tradedb.refdata import build_reference_db
+
 __version_info__ = None
 __version__ = None
 
@@ -25,14 +33,28 @@ def main():
         "data/RareItem.csv",
         "data/Ship.csv",
         "data/Upgrade.csv",
+        "data/reference.db",
         "tradedb/__init__.py",
+        "tradedb/cache.py",
         "tradedb/const.py",
         "tradedb/data.py",
+        "tradedb/depot.py",
+        "tradedb/events.py",
+        "tradedb/fanout.py",
+        "tradedb/indexes.py",
+        "tradedb/journalfiles.py",
+        "tradedb/maintenance.py",
+        "tradedb/market.py",
         "tradedb/misc.py",
+        "tradedb/profiler.py",
+        "tradedb/refdata.py",
+        "tradedb/statements.py",
         "tradedb/tables.py",
         "tradedb/tradedb.py",
+        "tradedb/writer.py",
     ]
     set_VERSION(file_list[0])
+    print("build:", build_reference_db("data"))
     base_name = "UpdateTD"
     zip_name = "{}_v{}.zip".format(base_name, __version__)
     print("make:", zip_name)
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""
+    Benchmark the tradedb package on synthetic TradeDangerous databases.
+    Runs without EDMC, results are written as JSON and can be compared
+    against a stored baseline.
+"""
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import logging
+import platform
+import argparse
+import statistics
+import tracemalloc
+import dataclasses
+
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from collections.abc import Callable
+
+import edmc_stub
+edmc_stub.install()
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+from tradedb import TradeDB, import_standard_data, fill_RareItem_cache, load_fdev_name_mapping
+from tradedb.refdata import REFERENCE_DB, build_reference_db
+from tradedb.tables import System, Station, StationItem
+
+SCHEMA_FILE = Path(__file__).with_name("td_schema.sql")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+STATIONS_PER_SYSTEM = 0.2
+SHIPS_PER_STATION = 20
+MODULES_PER_STATION = 800
+NAVROUTE_LENGTH = 120
+STATION_ID_OFFSET = 3_000_000_000
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+logger = logging.getLogger("benchmark")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-s", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+        help="number of systems of the synthetic databases",
+    )
+    parser.add_argument(
+        "-m", "--market-stations", type=int, default=500,
+        help="stations with a full market, shipyard and outfitting",
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="runs per benchmark")
+    parser.add_argument("-w", "--workdir", default=".", help="folder for the database files")
+    parser.add_argument("--reuse", action="store_true", help="reuse existing database files")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("-b", "--baseline", help="compare the results with this JSON file")
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=0.2,
+        help="allowed slowdown against the baseline (0.2 = 20%%)",
+    )
+    parser.add_argument("--rows", type=int, default=100_000, help="entries for the row measurements")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+def td_timestamp(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+def iso_timestamp(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def system_address(i: int) -> int:
+    return 10_000_000 + i * 1_021
+
+def new_tradedb(db_filename: Path, plugin_dir: Path = PLUGIN_DIR, use_rareitem_cache: bool = False) -> TradeDB:
+    tdb_logger = logging.getLogger("benchmark.tradedb")
+    tdb_logger.setLevel(logging.WARNING)
+    tdb = TradeDB(tdb_logger, str(db_filename), True, True, True, use_rareitem_cache)
+    fill_RareItem_cache(tdb, str(plugin_dir))
+    load_fdev_name_mapping(tdb, str(plugin_dir))
+    return tdb
+
+def make_plugin_dirs(workdir: Path) -> dict[str, Path]:
+    """plugin folders with only the csv files and with the reference database"""
+    csv_dir = Path(workdir, "startup_csv")
+    refdb_dir = Path(workdir, "startup_refdb")
+    for plugin_dir in (csv_dir, refdb_dir):
+        Path(plugin_dir, "data").mkdir(parents=True, exist_ok=True)
+    for csv_file in Path(PLUGIN_DIR, "data").glob("*.csv"):
+        for plugin_dir in (csv_dir, refdb_dir):
+            shutil.copyfile(csv_file, Path(plugin_dir, "data", csv_file.name))
+    Path(csv_dir, "data", REFERENCE_DB).unlink(missing_ok=True)
+    build_reference_db(str(Path(refdb_dir, "data")))
+    return {
+        "startup (csv)": csv_dir,
+        "startup (reference db)": refdb_dir,
+    }
+
+def build_database(db_filename: Path, systems: int, market_stations: int, rnd: random.Random) -> float:
+    """create the database, returns the time of the initial import_standard_data in ms"""
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_filename}{suffix}").unlink(missing_ok=True)
+    conn = sqlite3.connect(db_filename)
+    conn.executescript(SCHEMA_FILE.read_text())
+    conn.close()
+
+    tdb = new_tradedb(db_filename)
+    started = time.perf_counter()
+    import_standard_data(tdb, str(PLUGIN_DIR))
+    import_ms = (time.perf_counter() - started) * 1000
+    tdb.close()
+
+    modified = td_timestamp(BASE_TIME)
+    conn = sqlite3.connect(db_filename)
+    with conn:
+        conn.execute("INSERT INTO Added(added_id, name) VALUES(1, 'EDSM')")
+        conn.executemany(
+            "INSERT INTO System VALUES(?,?,?,?,?,?,?)",
+            (
+                (system_address(i), f"Synthetic {i}", rnd.uniform(-40000, 40000),
+                 rnd.uniform(-2000, 2000), rnd.uniform(-20000, 70000), 1, modified)
+                for i in range(systems)
+            )
+        )
+        conn.executemany(
+            "INSERT INTO Station(station_id, name, system_id, ls_from_star, max_pad_size, modified)"
+            " VALUES(?,?,?,?,?,?)",
+            (
+                (STATION_ID_OFFSET + i, f"Station {i}", system_address(i * 5 % systems),
+                 rnd.randint(5, 50000), "L", modified)
+                for i in range(int(systems * STATIONS_PER_SYSTEM))
+            )
+        )
+        item_ids = [item_id for (item_id,) in conn.execute("SELECT item_id FROM Item")]
+        ship_ids = [ship_id for (ship_id,) in conn.execute("SELECT ship_id FROM Ship")]
+        upgrade_ids = [upgrade_id for (upgrade_id,) in conn.execute("SELECT upgrade_id FROM Upgrade")]
+        for station_id in range(STATION_ID_OFFSET, STATION_ID_OFFSET + market_stations):
+            conn.executemany(
+                "INSERT INTO StationItem VALUES(?,?,?,?,?,?,?,?,?,0)",
+                (
+                    (station_id, item_id, rnd.randint(100, 9000), rnd.randint(0, 5000), rnd.randint(0, 3),
+                     rnd.randint(100, 9000), rnd.randint(0, 5000), rnd.randint(0, 3), modified)
+                    for item_id in item_ids
+                )
+            )
+            conn.executemany(
+                "INSERT INTO ShipVendor VALUES(?,?,?)",
+                ((ship_id, station_id, modified) for ship_id in rnd.sample(ship_ids, SHIPS_PER_STATION))
+            )
+            conn.executemany(
+                "INSERT INTO UpgradeVendor VALUES(?,?,?)",
+                (
+                    (upgrade_id, station_id, modified)
+                    for upgrade_id in rnd.sample(upgrade_ids, MODULES_PER_STATION)
+                )
+            )
+    conn.close()
+    return import_ms
+
+
+class Workload:
+    """Synthetic events for one database."""
+
+    def __init__(self, db_filename: Path, systems: int, market_stations: int, rnd: random.Random):
+        self.rnd = rnd
+        self.systems = systems
+        self.market_stations = market_stations
+        self.clock = BASE_TIME
+        self.next_system = systems
+        conn = sqlite3.connect(db_filename)
+        self.categories = dict(conn.execute("SELECT category_id, name FROM Category"))
+        self.items = conn.execute("SELECT item_id, name, category_id, avg_price FROM Item").fetchall()
+        self.ships = conn.execute("SELECT ship_id, name, cost FROM Ship").fetchall()
+        self.upgrades = conn.execute("SELECT upgrade_id, name FROM Upgrade").fetchall()
+        conn.close()
+
+    def timestamp(self) -> str:
+        self.clock += timedelta(seconds=30)
+        return iso_timestamp(self.clock)
+
+    def market_station(self) -> int:
+        return STATION_ID_OFFSET + self.rnd.randrange(self.market_stations)
+
+    def starport(self) -> dict:
+        """CAPI lastStarport payload"""
+        rnd = self.rnd
+        commodities = []
+        for item_id, name, category_id, avg_price in self.items:
+            supply = rnd.random() < 0.4
+            commodities.append({
+                "id": item_id,
+                "name": name,
+                "locName": name,
+                "categoryname": self.categories[category_id],
+                "meanPrice": avg_price,
+                "buyPrice": rnd.randint(100, 9000) if supply else 0,
+                "sellPrice": rnd.randint(100, 9000),
+                "stock": rnd.randint(1, 5000) if supply else 0,
+                "stockBracket": rnd.randint(1, 3) if supply else 0,
+                "demand": 0 if supply else rnd.randint(1, 5000),
+                "demandBracket": 0 if supply else rnd.randint(1, 3),
+            })
+        ships = {
+            name: {"id": ship_id, "name": name, "basevalue": cost}
+            for ship_id, name, cost in rnd.sample(self.ships, SHIPS_PER_STATION)
+        }
+        modules = {
+            str(upgrade_id): {"id": upgrade_id, "name": name}
+            for upgrade_id, name in rnd.sample(self.upgrades, MODULES_PER_STATION)
+        }
+        return {
+            "id": self.market_station(),
+            "timestamp": self.timestamp(),
+            "commodities": commodities,
+            "ships": {"shipyard_list": ships},
+            "modules": modules,
+        }
+
+    def jump(self) -> dict:
+        i = self.rnd.randrange(self.systems)
+        return {
+            "event": "FSDJump",
+            "timestamp": self.timestamp(),
+            "SystemAddress": system_address(i),
+            "StarSystem": f"Synthetic {i}",
+            "StarPos": [self.rnd.uniform(-100, 100), 0, 0],
+        }
+
+    def docked(self) -> dict:
+        station_id = self.market_station()
+        return {
+            "event": "Docked",
+            "timestamp": self.timestamp(),
+            "SystemAddress": system_address((station_id - STATION_ID_OFFSET) * 5 % self.systems),
+            "MarketID": station_id,
+            "StationName": f"Station {station_id - STATION_ID_OFFSET}",
+            "StationType": self.rnd.choice(("Coriolis", "Orbis", "Outpost")),
+            "StationServices": self.rnd.sample(
+                ["Commodities", "Shipyard", "Outfitting", "BlackMarket", "Refuel", "Repair", "Rearm"], 4
+            ),
+            "LandingPads": {"Small": 4, "Medium": 4, "Large": self.rnd.randint(0, 2)},
+            "DistFromStarLS": self.rnd.uniform(5, 50000),
+        }
+
+    def navroute(self) -> list[dict]:
+        """route with one third unknown systems"""
+        timestamp = self.timestamp()
+        route = []
+        for hop in range(NAVROUTE_LENGTH):
+            if hop % 3:
+                i = self.rnd.randrange(self.systems)
+            else:
+                i = self.next_system
+                self.next_system += 1
+            route.append({
+                "timestamp": timestamp,
+                "SystemAddress": system_address(i),
+                "StarSystem": f"Synthetic {i}",
+                "StarPos": [hop * 100.0, 0, 0],
+            })
+        return route
+
+
+def measure(func: Callable[[], None], prepare: Callable[[], tuple], repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        args = prepare()
+        started = time.perf_counter()
+        func(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "repeat": repeat,
+    }
+
+def plain_dataclass(table_class: type) -> type:
+    """the table class as it was generated before: no slots, no row helpers"""
+    return dataclasses.make_dataclass(
+        table_class.__name__,
+        [
+            (fld.name, fld.type, dataclasses.field(default=fld.default, default_factory=fld.default_factory))
+            for fld in dataclasses.fields(table_class)
+        ],
+        frozen = True,
+    )
+
+def asdict_diff(old_entry, new_entry) -> dict:
+    return {
+        name: new_value
+        for name, old_value in dataclasses.asdict(old_entry).items()
+        if (new_value := getattr(new_entry, name)) != old_value
+    }
+
+def measure_rows(rows: int) -> dict:
+    """memory per cached entry and per row conversion costs, slotted vs plain dataclasses"""
+    results = {}
+    for table_class, row in (
+        (System, (1, "Sol", 0.0, 0.0, 0.0, 1, "2025-01-01 00:00:00")),
+        (Station, (1, "Abraham Lincoln", 1, 500, "Y", "L", "Y", "Y", "2025-01-01 00:00:00",
+                   "Y", "Y", "Y", "Y", "N", 3)),
+        (StationItem, (1, 2, 1000, 500, 2, 0, 0, 0, "2025-01-01 00:00:00", 0)),
+    ):
+        stats = {}
+        plain_class = plain_dataclass(table_class)
+        for kind, cls in (("plain", plain_class), ("slots", table_class)):
+            tracemalloc.start()
+            # distinct first column like the cache keys
+            entries = [cls(i, *row[1:]) for i in range(rows)]
+            stats[f"bytes_{kind}"] = round(tracemalloc.get_traced_memory()[0] / rows, 1)
+            tracemalloc.stop()
+            del entries
+        plain, other_plain = plain_class(*row), plain_class(*row[:-1], None)
+        slots, other_slots = table_class.from_row(row), table_class.from_row((*row[:-1], None))
+        for name, func in (
+            ("to_row_ns_astuple", lambda: dataclasses.astuple(plain)),
+            ("to_row_ns", slots.to_row),
+            ("diff_ns_asdict", lambda: asdict_diff(plain, other_plain)),
+            ("diff_ns", lambda: slots.diff(other_slots)),
+        ):
+            started = time.perf_counter()
+            for _ in range(rows):
+                func()
+            stats[name] = round((time.perf_counter() - started) * 1e9 / rows, 1)
+        results[table_class.__name__] = stats
+        logger.info(f"{table_class.__name__:<12} {stats}")
+    return results
+
+def run_size(args, systems: int) -> dict:
+    rnd = random.Random(args.seed)
+    db_filename = Path(args.workdir, f"benchmark_{systems}.db")
+    results = {}
+    if args.reuse and db_filename.is_file():
+        logger.info(f"reuse {db_filename}")
+    else:
+        logger.info(f"build {db_filename}")
+        started = time.perf_counter()
+        import_ms = build_database(db_filename, systems, args.market_stations, rnd)
+        logger.info(f"built in {time.perf_counter() - started:.1f} s")
+        results["import_standard_data (empty)"] = {
+            "median_ms": round(import_ms, 3), "min_ms": round(import_ms, 3),
+            "mean_ms": round(import_ms, 3), "repeat": 1,
+        }
+
+    workload = Workload(db_filename, systems, args.market_stations, rnd)
+    tdb = new_tradedb(db_filename)
+    no_args = lambda: ()
+    cases = {
+        "load": (tdb.load, no_args),
+        "update_system": (tdb.update_system, lambda: (workload.jump(), "Benchmark")),
+        "update_systems (NavRoute)": (tdb.update_systems, lambda: (workload.navroute(), "Benchmark")),
+        "update_station": (tdb.update_station, lambda: (workload.docked(),)),
+        "update_market": (tdb.update_market, lambda: (workload.starport(),)),
+        "update_shipyard": (tdb.update_shipyard, lambda: (workload.starport(),)),
+        "update_outfitting": (tdb.update_outfitting, lambda: (workload.starport(),)),
+        "import_standard_data": (lambda: import_standard_data(tdb, str(PLUGIN_DIR)), no_args),
+    }
+    for name, (func, prepare) in cases.items():
+        results[name] = measure(func, prepare, args.repeat)
+        logger.info(f"{systems:>9} {name:<34} {results[name]['median_ms']:>10.3f} ms")
+    tdb.close()
+
+    # TradeDB with reference caches, rare items and fdev mapping as in plugin_start3
+    for name, plugin_dir in make_plugin_dirs(Path(args.workdir)).items():
+        startup = lambda: new_tradedb(db_filename, plugin_dir, True).close()
+        results[name] = measure(startup, no_args, args.repeat)
+        logger.info(f"{systems:>9} {name:<34} {results[name]['median_ms']:>10.3f} ms")
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for size, cases in results.items():
+        for name, stats in cases.items():
+            if not (base := baseline.get(size, {}).get(name)):
+                continue
+            ratio = stats["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+            text = f"{size:>9} {name:<34} {base['median_ms']:>10.3f} -> {stats['median_ms']:>10.3f} ms ({ratio:.2f}x)"
+            if ratio > 1 + tolerance:
+                regressions.append(text)
+                logger.warning(f"REGRESSION {text}")
+            else:
+                logger.info(f"ok         {text}")
+    return regressions
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    report = {
+        "meta": {
+            "created": iso_timestamp(datetime.now(timezone.utc)),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "market_stations": args.market_stations,
+        },
+        "results": {str(systems): run_size(args, systems) for systems in args.sizes},
+        "rows": measure_rows(args.rows),
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        logger.info(f"results written to {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if compare(report["results"], baseline["results"], args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+    Minimal stand-ins for the EDMC modules used by the tradedb package,
+    so the package can be used outside of EDMC (replay, benchmark).
+"""
+import sys
+import types
+import logging
+
+APPNAME = "EDMarketConnector"
+SERVER_LIVE = "https://companion.orerve.net"
+
+# subset of edmc_data.companion_category_map
+COMPANION_CATEGORY_MAP = {
+    "Narcotics": "Legal Drugs",
+    "Slaves": "Slavery",
+    "Waste ": "Waste",
+    "NonMarketable": False,
+}
+
+# subset of edmc_data.ship_name_map, unknown symbols keep their name
+SHIP_NAME_MAP = {
+    "adder": "Adder",
+    "anaconda": "Anaconda",
+    "asp": "Asp Explorer",
+    "asp_scout": "Asp Scout",
+    "belugaliner": "Beluga Liner",
+    "cobramkiii": "Cobra Mk III",
+    "cobramkiv": "Cobra Mk IV",
+    "cobramkv": "Cobra Mk V",
+    "corsair": "Corsair",
+    "cutter": "Imperial Cutter",
+    "diamondback": "Diamondback Scout",
+    "diamondbackxl": "Diamondback Explorer",
+    "dolphin": "Dolphin",
+    "eagle": "Eagle",
+    "empire_courier": "Imperial Courier",
+    "empire_eagle": "Imperial Eagle",
+    "empire_trader": "Imperial Clipper",
+    "explorer_nx": "Caspian Explorer",
+    "federation_corvette": "Federal Corvette",
+    "federation_dropship": "Federal Dropship",
+    "federation_dropship_mkii": "Federal Assault Ship",
+    "federation_gunship": "Federal Gunship",
+    "ferdelance": "Fer-de-Lance",
+    "hauler": "Hauler",
+    "independant_trader": "Keelback",
+    "krait_light": "Krait Phantom",
+    "krait_mkii": "Krait Mk II",
+    "lakonminer": "Type-11 Prospector",
+    "mamba": "Mamba",
+    "mandalay": "Mandalay",
+    "orca": "Orca",
+    "panthermkii": "Panther Clipper Mk II",
+    "python": "Python",
+    "python_nx": "Python Mk II",
+    "sidewinder": "Sidewinder",
+    "type6": "Type-6 Transporter",
+    "type7": "Type-7 Transporter",
+    "type8": "Type-8 Transporter",
+    "type9": "Type-9 Heavy",
+    "type9_military": "Type-10 Defender",
+    "typex": "Alliance Chieftain",
+    "typex_2": "Alliance Crusader",
+    "typex_3": "Alliance Challenger",
+    "viper": "Viper Mk III",
+    "viper_mkiv": "Viper Mk IV",
+    "vulture": "Vulture",
+}
+
+
+class CAPIData(dict):
+    """dict with the source host, like companion.CAPIData"""
+
+    def __init__(self, data: dict | None = None, source_host: str = SERVER_LIVE):
+        super().__init__(data or {})
+        self.source_host = source_host
+
+
+class Config(dict):
+    """in-memory replacement of config.config"""
+
+    def get_str(self, key: str, *, default: str | None = None) -> str | None:
+        return self.get(key, default)
+
+    def get_bool(self, key: str, *, default: bool | None = None) -> bool | None:
+        return self.get(key, default)
+
+    def get_int(self, key: str, *, default: int = 0) -> int:
+        return self.get(key, default)
+
+    def get_list(self, key: str, *, default: list | None = None) -> list | None:
+        return self.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        self[key] = value
+
+
+def make_module(name: str, **attributes) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+def install() -> None:
+    """register the stubs, real EDMC modules win if they are importable"""
+    stubs = {
+        "companion": dict(CAPIData=CAPIData, SERVER_LIVE=SERVER_LIVE),
+        "edmc_data": dict(
+            companion_category_map=COMPANION_CATEGORY_MAP, ship_name_map=SHIP_NAME_MAP
+        ),
+        "config": dict(appname=APPNAME, config=Config()),
+    }
+    for name, attributes in stubs.items():
+        if name in sys.modules:
+            continue
+        try:
+            __import__(name)
+        except ImportError:
+            sys.modules[name] = make_module(name, **attributes)
+            logging.getLogger(APPNAME).debug(f"using stub module {name!r}")
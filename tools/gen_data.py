@@ -1,9 +1,18 @@
+import sys
 import csv
 import sqlite3
 import argparse
 
 from pathlib import Path
 
+import edmc_stub
+edmc_stub.install()
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+from tradedb.refdata import REFERENCE_DB, build_reference_db
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -52,5 +61,8 @@ def main():
 
     conn.close()
 
+    print(f"generating: {Path(out_dir_path, REFERENCE_DB)}")
+    build_reference_db(str(out_dir_path))
+
 if __name__ == "__main__":
     main()
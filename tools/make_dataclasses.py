@@ -17,14 +17,15 @@ def print_dataclass(conn, db_basename, table_name, out_file):
     curs = conn.cursor()
 
     need_default = False
+    field_names = []
     out_file.write("\n")
-    out_file.write("@dataclass(frozen=True)\n")
+    out_file.write("@dataclass(frozen=True, slots=True)\n")
     out_file.write(f"class {table_name}:\n")
     out_file.write(f'    """{db_basename} "{table_name}" table"""\n')
     for col_row in curs.execute(f"PRAGMA table_xinfo('{table_name}')"):
-        out_file.write(f"    {col_row['name']}")
-        if keyword.iskeyword(col_row["name"]):
-             out_file.write("_")
+        field_name = f"{col_row['name']}_" if keyword.iskeyword(col_row["name"]) else col_row["name"]
+        field_names.append(field_name)
+        out_file.write(f"    {field_name}")
         if not col_row["type"]:
             out_type = "bytes"
         elif any(x in col_row["type"].upper() for x in ("INT", "NUMBER")):
@@ -50,6 +51,28 @@ def print_dataclass(conn, db_basename, table_name, out_file):
         out_file.write("\n")
 
     curs.close()
+    print_row_helpers(field_names, out_file)
+
+def print_row_helpers(field_names, out_file):
+    out_file.write("\n")
+    out_file.write("    @classmethod\n")
+    out_file.write("    def from_row(cls, row: tuple) -> Self:\n")
+    out_file.write("        return cls(*row)\n")
+    out_file.write("\n")
+    out_file.write("    def to_row(self) -> tuple:\n")
+    out_file.write("        return (\n")
+    for name in field_names:
+        out_file.write(f"            self.{name},\n")
+    out_file.write("        )\n")
+    out_file.write("\n")
+    out_file.write("    def diff(self, other: Self) -> dict[str, Any]:\n")
+    out_file.write('        """columns with a different value in other"""\n')
+    out_file.write("        changed = {}\n")
+    for name in field_names:
+        out_file.write(f"        if self.{name} != other.{name}:\n")
+        column = name.rstrip("_")
+        out_file.write(f'            changed["{column}"] = other.{name}\n')
+    out_file.write("        return changed\n")
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -97,11 +120,13 @@ def main():
         )
         gen_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
         out_file.write('"""\n')
-        out_file.write(f"   auto generated on {gen_time}\n")
+        out_file.write(f"   generated by tools/make_dataclasses.py on {gen_time}\n")
         out_file.write(f"   database file: {db_filepath}\n")
+        out_file.write("   change the generator and run it again instead of editing this file\n")
         out_file.write('"""\n')
 
         out_file.write("""
+from typing import Self, Any
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+    Replay journal files and Market.json / Shipyard.json / Outfitting.json / NavRoute.json snapshots
+    into a TradeDangerous database, without EDMC.
+"""
+import sys
+import json
+import time
+import heapq
+import logging
+import argparse
+
+from pathlib import Path
+from datetime import datetime
+from itertools import chain, islice
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple
+
+import edmc_stub
+edmc_stub.install()
+
+PLUGIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_DIR))
+
+from tradedb import TradeDB, fill_RareItem_cache, load_fdev_name_mapping
+from tradedb.events import journal_actions
+
+REPLAY_EVENTS = {
+    "FSDJump", "Location", "CarrierJump", "NavRoute", "Docked",
+    "ColonisationConstructionDepot", "Market", "Shipyard", "Outfitting",
+}
+JOURNAL_GLOB = "Journal.*.log"
+SNAPSHOT_GLOBS = ("Market*.json", "Shipyard*.json", "Outfitting*.json", "NavRoute*.json")
+# table of the station data written by the snapshot actions
+SNAPSHOT_TABLES = {
+    "update_journal_market": "StationItem",
+    "update_journal_shipyard": "ShipVendor",
+    "update_journal_outfitting": "UpgradeVendor",
+}
+
+logger = logging.getLogger("replay")
+
+
+class ReplayEvent(NamedTuple):
+    timestamp: str
+    entry: dict
+    cmdrname: str
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="journal folders, journal files or json snapshots")
+    parser.add_argument("-d", "--database", required=True, help="TradeDangerous database file")
+    parser.add_argument("-c", "--checkpoint", help="checkpoint file, resume from it if it exists")
+    parser.add_argument("-b", "--batch", type=int, default=5000, help="events per transaction")
+    parser.add_argument("--cmdr", default="Replay", help="commander name if the journal has none")
+    parser.add_argument("--create-module", action="store_true", help="create unknown modules")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args()
+
+def collect_files(paths: Iterable[str]) -> tuple[list[Path], list[Path]]:
+    journal_files, snapshot_files = [], []
+    for path in map(Path, paths):
+        if path.is_dir():
+            journal_files.extend(path.glob(JOURNAL_GLOB))
+            snapshot_files.extend(chain.from_iterable(path.glob(glob) for glob in SNAPSHOT_GLOBS))
+        elif path.suffix == ".json":
+            snapshot_files.append(path)
+        else:
+            journal_files.append(path)
+    return journal_files, snapshot_files
+
+def first_timestamp(path: Path) -> str:
+    with path.open(encoding="UTF-8") as journal_file:
+        for line in journal_file:
+            try:
+                return json.loads(line)["timestamp"]
+            except (ValueError, KeyError):
+                continue
+    return ""
+
+def read_journal(path: Path, cmdrname: str) -> Iterator[ReplayEvent]:
+    with path.open(encoding="UTF-8") as journal_file:
+        for line in journal_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            event = entry.get("event")
+            if event == "Fileheader" and "beta" in entry.get("gameversion", "").lower():
+                logger.info(f"{path.name}: beta game ignored")
+                return
+            if event == "Commander":
+                cmdrname = entry.get("Name", cmdrname)
+            elif event == "LoadGame":
+                cmdrname = entry.get("Commander", cmdrname)
+            elif event in REPLAY_EVENTS:
+                yield ReplayEvent(entry["timestamp"], entry, cmdrname)
+
+def read_snapshots(paths: Iterable[Path], cmdrname: str) -> list[ReplayEvent]:
+    events = []
+    for path in paths:
+        try:
+            entry = json.loads(path.read_text(encoding="UTF-8"))
+        except (OSError, ValueError) as err:
+            logger.warning(f"{path}: {err}")
+            continue
+        if entry.get("event") in REPLAY_EVENTS:
+            events.append(ReplayEvent(entry["timestamp"], entry, cmdrname))
+    return sorted(events, key=lambda event: event.timestamp)
+
+def iter_events(paths: Iterable[str], cmdrname: str) -> Iterator[ReplayEvent]:
+    """all events in timestamp order, the journal files are read lazily"""
+    journal_files, snapshot_files = collect_files(paths)
+    journal_files.sort(key=first_timestamp)
+    logger.info(f"{len(journal_files)} journal files, {len(snapshot_files)} snapshots")
+    journal_events = chain.from_iterable(read_journal(path, cmdrname) for path in journal_files)
+    snapshot_events = read_snapshots(snapshot_files, cmdrname)
+    return heapq.merge(journal_events, snapshot_events, key=lambda event: event.timestamp)
+
+def load_checkpoint(filename: str | None) -> dict:
+    """the timestamp of the last applied event and the number of applied events with that timestamp"""
+    checkpoint = {"timestamp": None, "done": 0}
+    if filename and Path(filename).is_file():
+        checkpoint.update(json.loads(Path(filename).read_text()))
+    return checkpoint
+
+def save_checkpoint(filename: str | None, timestamp: str, done: int) -> None:
+    if filename:
+        Path(filename).write_text(json.dumps({"timestamp": timestamp, "done": done}))
+
+def resume_events(events: Iterator[ReplayEvent], timestamp: str, done: int) -> Iterator[ReplayEvent]:
+    """
+    skip the events up to the checkpoint; new files or refreshed snapshots
+    only add events, so this does not depend on their position in the stream
+    """
+    skipped = 0
+    for event in events:
+        if event.timestamp < timestamp:
+            skipped += 1
+            continue
+        if event.timestamp == timestamp and done:
+            done -= 1
+            skipped += 1
+            continue
+        logger.info(f"resume at {event.timestamp}, {skipped} events skipped")
+        yield event
+        break
+    yield from events
+
+def snapshot_is_newer(tdb: TradeDB, entry: dict, table: str) -> bool:
+    """do not overwrite newer station data with an old snapshot"""
+    timestamp = datetime.fromisoformat(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    stmt = f"SELECT max(modified) FROM {table} WHERE station_id = ?"
+    (modified,) = tdb.execute(stmt, (entry["MarketID"],)).fetchone()
+    return modified is None or modified < timestamp
+
+def apply_event(tdb: TradeDB, event: ReplayEvent) -> None:
+    for action in journal_actions(event.entry, event.cmdrname):
+        table = SNAPSHOT_TABLES.get(action.method)
+        if table and not snapshot_is_newer(tdb, event.entry, table):
+            logger.debug(f"skip old {action.name} {event.timestamp}")
+            continue
+        getattr(tdb, action.method)(*action.args)
+
+def apply_batch(tdb: TradeDB, batch: list[ReplayEvent]) -> int:
+    """apply the batch in one transaction, on error one by one skipping the bad events"""
+    try:
+        with tdb.transaction():
+            for event in batch:
+                apply_event(tdb, event)
+        return 0
+    except Exception:
+        logger.warning("batch failed, retry event by event")
+    failed = 0
+    for event in batch:
+        try:
+            with tdb.transaction():
+                apply_event(tdb, event)
+        except Exception:
+            failed += 1
+            logger.exception(f"{event.entry['event']} {event.timestamp} failed")
+    return failed
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    if not Path(args.database).is_file():
+        logger.error(f"{args.database}: not found")
+        return
+
+    tdb = TradeDB(logger, args.database, create_module=args.create_module)
+    fill_RareItem_cache(tdb, str(PLUGIN_DIR))
+    load_fdev_name_mapping(tdb, str(PLUGIN_DIR))
+    # the per statement logging would dominate the run time
+    tdb.logger = logging.getLogger("replay.tradedb")
+    tdb.logger.setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    checkpoint = load_checkpoint(args.checkpoint)
+    last_timestamp, done = checkpoint["timestamp"], checkpoint["done"]
+    events = iter_events(args.paths, args.cmdr)
+    if last_timestamp:
+        logger.info(f"resume after {last_timestamp} ({done} events with that timestamp done)")
+        events = resume_events(events, last_timestamp, done)
+
+    count = failed = 0
+    started = time.perf_counter()
+    with tdb.bulk_mode():
+        while batch := list(islice(events, args.batch)):
+            failed += apply_batch(tdb, batch)
+            count += len(batch)
+            for event in batch:
+                if event.timestamp == last_timestamp:
+                    done += 1
+                else:
+                    last_timestamp, done = event.timestamp, 1
+            save_checkpoint(args.checkpoint, last_timestamp, done)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"{count} events ({failed} failed) up to {batch[-1].timestamp}"
+                f", {count / elapsed:.0f} events/s"
+            )
+    tdb.close()
+    elapsed = time.perf_counter() - started
+    logger.info(f"done: {count} events in {elapsed:.1f} s, {count / max(elapsed, 1e-9):.0f} events/s")
+
+if __name__ == "__main__":
+    main()
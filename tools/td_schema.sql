@@ -0,0 +1,136 @@
+-- TradeDangerous compatible schema of the tables used by the plugin,
+-- used by tools/benchmark.py to build synthetic databases.
+PRAGMA foreign_keys=ON;
+
+CREATE TABLE Added (
+    added_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    UNIQUE(name)
+);
+
+CREATE TABLE System (
+    system_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    pos_x DOUBLE NOT NULL,
+    pos_y DOUBLE NOT NULL,
+    pos_z DOUBLE NOT NULL,
+    added_id INTEGER,
+    modified DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (added_id) REFERENCES Added(added_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
+CREATE INDEX idx_system_by_pos ON System (pos_x, pos_y, pos_z, system_id);
+CREATE INDEX idx_system_by_name ON System (name);
+
+CREATE TABLE Station (
+    station_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    system_id INTEGER NOT NULL,
+    ls_from_star INTEGER NOT NULL DEFAULT 0 CHECK (ls_from_star >= 0),
+    blackmarket TEXT(1) NOT NULL DEFAULT '?' CHECK (blackmarket IN ('?', 'Y', 'N')),
+    max_pad_size TEXT(1) NOT NULL DEFAULT '?' CHECK (max_pad_size IN ('?', 'S', 'M', 'L')),
+    market TEXT(1) NOT NULL DEFAULT '?' CHECK (market IN ('?', 'Y', 'N')),
+    shipyard TEXT(1) NOT NULL DEFAULT '?' CHECK (shipyard IN ('?', 'Y', 'N')),
+    modified DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    outfitting TEXT(1) NOT NULL DEFAULT '?' CHECK (outfitting IN ('?', 'Y', 'N')),
+    rearm TEXT(1) NOT NULL DEFAULT '?' CHECK (rearm IN ('?', 'Y', 'N')),
+    refuel TEXT(1) NOT NULL DEFAULT '?' CHECK (refuel IN ('?', 'Y', 'N')),
+    repair TEXT(1) NOT NULL DEFAULT '?' CHECK (repair IN ('?', 'Y', 'N')),
+    planetary TEXT(1) NOT NULL DEFAULT '?' CHECK (planetary IN ('?', 'Y', 'N')),
+    type_id INTEGER DEFAULT 0 NOT NULL,
+    FOREIGN KEY (system_id) REFERENCES System(system_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
+CREATE INDEX idx_station_by_system ON Station (system_id);
+CREATE INDEX idx_station_by_name ON Station (name);
+
+CREATE TABLE Ship (
+    ship_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    cost INTEGER
+);
+
+CREATE TABLE ShipVendor (
+    ship_id INTEGER NOT NULL,
+    station_id INTEGER NOT NULL,
+    modified DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ship_id, station_id),
+    FOREIGN KEY (ship_id) REFERENCES Ship(ship_id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (station_id) REFERENCES Station(station_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX idx_shipvendor_by_station ON ShipVendor (station_id);
+
+CREATE TABLE Upgrade (
+    upgrade_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    class NUMBER NOT NULL,
+    rating CHAR(1) NOT NULL,
+    ship VARCHAR(40) COLLATE nocase
+);
+
+CREATE TABLE UpgradeVendor (
+    upgrade_id INTEGER NOT NULL,
+    station_id INTEGER NOT NULL,
+    modified DATETIME NOT NULL,
+    PRIMARY KEY (upgrade_id, station_id),
+    FOREIGN KEY (upgrade_id) REFERENCES Upgrade(upgrade_id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (station_id) REFERENCES Station(station_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+) WITHOUT ROWID;
+CREATE INDEX idx_vendor_by_station_id ON UpgradeVendor (station_id);
+
+CREATE TABLE Category (
+    category_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase
+);
+
+CREATE TABLE Item (
+    item_id INTEGER PRIMARY KEY,
+    name VARCHAR(40) COLLATE nocase,
+    category_id INTEGER NOT NULL,
+    ui_order INTEGER NOT NULL DEFAULT 0,
+    avg_price INTEGER,
+    fdev_id INTEGER,
+    FOREIGN KEY (category_id) REFERENCES Category(category_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+CREATE TABLE RareItem (
+    rare_id INTEGER PRIMARY KEY,
+    station_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    name VARCHAR(40) COLLATE nocase,
+    cost INTEGER,
+    max_allocation INTEGER,
+    illegal TEXT(1) NOT NULL DEFAULT '?' CHECK (illegal IN ('?', 'Y', 'N')),
+    suppressed TEXT(1) NOT NULL DEFAULT '?' CHECK (suppressed IN ('?', 'Y', 'N')),
+    UNIQUE (name),
+    FOREIGN KEY (station_id) REFERENCES Station(station_id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES Category(category_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+CREATE TABLE StationItem (
+    station_id INTEGER NOT NULL,
+    item_id INTEGER NOT NULL,
+    demand_price INT NOT NULL,
+    demand_units INT NOT NULL,
+    demand_level INT NOT NULL,
+    supply_price INT NOT NULL,
+    supply_units INT NOT NULL,
+    supply_level INT NOT NULL,
+    modified DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    from_live INTEGER DEFAULT 0 NOT NULL,
+    PRIMARY KEY (station_id, item_id),
+    FOREIGN KEY (station_id) REFERENCES Station(station_id)
+        ON UPDATE CASCADE ON DELETE CASCADE,
+    FOREIGN KEY (item_id) REFERENCES Item(item_id)
+        ON UPDATE CASCADE ON DELETE CASCADE
+);
+CREATE INDEX si_mod_stn_itm ON StationItem(modified, station_id, item_id);
+CREATE INDEX si_itm_dmdpr ON StationItem(item_id, demand_price) WHERE demand_price > 0;
+CREATE INDEX si_itm_suppr ON StationItem(item_id, supply_price) WHERE supply_price > 0;
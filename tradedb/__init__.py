@@ -1,2 +1,6 @@
 from .tradedb import TradeDB
 from .data import import_standard_data, fill_RareItem_cache, load_fdev_name_mapping
+from .writer import TradeDBWriter
+from .fanout import TradeDBFanout
+from .maintenance import Maintenance
+from .profiler import StatementProfiler
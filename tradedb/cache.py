@@ -0,0 +1,70 @@
+from typing import Self, Any
+from collections import OrderedDict
+from collections.abc import Iterator, Hashable
+
+
+class LRUCache:
+    """Size bounded mapping, evicts the least recently used entry."""
+
+    def __init__(self: Self, maxsize: int):
+        self.maxsize = maxsize
+        self.data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self: Self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __getitem__(self: Self, key: Hashable) -> Any:
+        value = self.data[key]
+        self.data.move_to_end(key)
+        return value
+
+    def __setitem__(self: Self, key: Hashable, value: Any) -> None:
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize > 0:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self: Self, key: Hashable) -> bool:
+        return key in self.data
+
+    def __len__(self: Self) -> int:
+        return len(self.data)
+
+    def __iter__(self: Self) -> Iterator[Hashable]:
+        return iter(self.data)
+
+    def pop(self: Self, key: Hashable, *default: Any) -> Any:
+        return self.data.pop(key, *default)
+
+    def values(self: Self) -> Iterator[Any]:
+        return iter(self.data.values())
+
+    def items(self: Self) -> Iterator[tuple[Hashable, Any]]:
+        return iter(self.data.items())
+
+    def clear(self: Self) -> None:
+        self.data.clear()
+
+    @property
+    def stats(self: Self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.data),
+            "maxsize": self.maxsize,
+        }
+
+    def __repr__(self: Self) -> str:
+        return f"{self.__class__.__name__}({self.stats})"
@@ -3,6 +3,26 @@
 """
 import re
 
+# lowest default SQLITE_MAX_VARIABLE_NUMBER (before SQLite 3.32.0)
+SQLITE_MAX_VARIABLES = 999
+
+# default number of cached System / Station entries
+SYSTEM_CACHE_SIZE = 5000
+STATION_CACHE_SIZE = 1000
+
+# waiting for a lock held by another process (e.g. trade.py)
+BUSY_TIMEOUT_MS = 5000
+# retries of a unit of work that failed with "database is locked"
+LOCK_RETRIES = 5
+LOCK_BACKOFF_MS = 100
+LOCK_BACKOFF_MAX_MS = 5000
+# waiting for the writers at shutdown, the rest of their queues is lost
+STOP_TIMEOUT_S = 10
+
+# side table with the payload fingerprint per station and service
+FINGERPRINT_TABLE = "UpdateTD_Fingerprint"
+# side table with the progress of the construction depots
+DEPOT_TABLE = "UpdateTD_Depot"
 
 PLANETARY_STATION_TYPES = {
     "CRATERPORT",
@@ -47,3 +67,10 @@ COLONISATIONSHIP_REGEX = re.compile(r"\$EXT_PANEL_ColonisationShip", re.IGNORECA
 COLONISATIONSHIP_NAME = "System Colonisation Ship"
 
 REGEX_NORMALIZE_NAME = re.compile(r"^(\$)?(?P<name>.*?)(_name;)?$", re.IGNORECASE)
+
+# Market.json category symbols whose title case is not the TradeDangerous category
+MARKET_CATEGORY_MAP = {
+    "drugs": "Legal Drugs",
+    "nonmarketable": "NonMarketable",
+    "slaves": "Slavery",
+}
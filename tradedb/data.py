@@ -1,69 +1,119 @@
 import csv
 import os.path
 
-from typing import TYPE_CHECKING, Any
-from dataclasses import asdict
+from typing import TYPE_CHECKING
 
 
-from .misc import insert_from_dict, update_from_dict, convert_dict_to_class
-from .tables import Category, Item, Ship, Upgrade, RareItem
+from .statements import get_statements
+from .tables import Item, Ship, Upgrade, RareItem
+from .refdata import (
+    reference_db_path, reference_columns, read_reference, convert_csv_row,
+    create_reference_tables, fill_reference_tables,
+)
 
 if TYPE_CHECKING:
     from .tradedb import TradeDB
 
 
-def update_import_entry(
-    tdb: "TradeDB", tbl_name: str, old_entry: Any, new_entry: Any, **id_columns
-) -> bool:
-    if old_entry != new_entry:
-        if old_entry is None:
-            stmt, bind = insert_from_dict(tbl_name, asdict(new_entry))
-            tdb.logger.info(f"created {new_entry}")
-        else:
-            upd_columns = {}
-            for col_name, old_value in asdict(old_entry).items():
-                new_value = getattr(new_entry, col_name)
-                if new_value != old_value:
-                    upd_columns[col_name] = new_value
-            stmt, bind = update_from_dict(tbl_name, upd_columns, **id_columns)
-            tdb.logger.info(f"updated {id_columns}, {upd_columns}")
-        tdb.execute(stmt, bind)
-        return True
-    return False
+# tables of the "Import" button, in import order
+IMPORT_TABLES = (Item, Ship, Upgrade)
+# columns maintained by the plugin, they are not overwritten by the import
+IMPORT_KEEP_COLUMNS = {"Item": ("ui_order",)}
+REFERENCE_SCHEMA = "reference"
 
-def import_standard_data(tdb: "TradeDB", plugin_dir: str) -> None:
-    for table_name, table_class, table_cache, id_column in (
-        ("Category", Category, tdb.category_by_id, "category_id"),
-        ("Item", Item, tdb.item_by_id, "item_id"),
-        ("Ship", Ship, tdb.ship_by_id, "ship_id"),
-        ("Upgrade", Upgrade, tdb.upgrade_by_id, "upgrade_id"),
-    ):
-        import_file = os.path.join(plugin_dir, "data", f"{table_name}.csv")
-        if not os.path.isfile(import_file):
-            tdb.logger.warning(f"import file {import_file!r} not found")
-            continue
-        tdb.logger.info(f"import {import_file!r}")
-        with open(import_file, encoding="UTF-8", newline="") as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            for row in csv_reader:
-                if table_name == "Category":
-                    _ = tdb.get_Category(row["name"])
-                    continue
-                elif table_name == "Item":
-                    row["category_id"] = tdb.get_Category(row.pop("name@Category.category_id")).category_id
-                new_entry = convert_dict_to_class(table_class, row)
-                id_value = getattr(new_entry, id_column)
-                old_entry = table_cache.get(id_value)
-                if update_import_entry(
-                    tdb, table_name, old_entry, new_entry, **{id_column: id_value}
-                ):
-                    table_cache[id_value] = new_entry
-                    if table_name == "Item":
-                        tdb.reorder_item = True
 
-    tdb.update_item_ui_order()
+def import_standard_data(tdb: "TradeDB", plugin_dir: str) -> None:
+    """
+    Merge the reference data into the database. data/reference.db (or the
+    csv files loaded into an in-memory database) is attached and merged with
+    one statement per table. Must not be called inside an open transaction.
+    """
+    if not tdb.is_connected:
+        tdb.logger.info("Database not connected.")
+        return
+    data_dir = os.path.join(plugin_dir, "data")
+    if reference_db := reference_db_path(plugin_dir):
+        tdb.logger.info(f"import {reference_db!r}")
+        tdb.execute(f"ATTACH DATABASE ? AS {REFERENCE_SCHEMA}", (reference_db,))
+    else:
+        tdb.logger.info(f"import csv files of {data_dir!r}")
+        tdb.execute(f"ATTACH DATABASE ':memory:' AS {REFERENCE_SCHEMA}")
+    try:
+        with tdb.transaction():
+            if not reference_db:
+                create_reference_tables(tdb.conn, REFERENCE_SCHEMA)
+                fill_reference_tables(tdb.conn, data_dir, REFERENCE_SCHEMA)
+            counts = _import_standard_data(tdb)
+    finally:
+        tdb.execute(f"DETACH DATABASE {REFERENCE_SCHEMA}")
+    for table_name, (created, updated, unchanged) in counts.items():
+        tdb.logger.info(f"{table_name}: created {created}, updated {updated}, unchanged {unchanged}")
     tdb.logger.info("import done")
 
+def _import_standard_data(tdb: "TradeDB") -> dict[str, tuple[int, int, int]]:
+    counts = {}
+    known = len(tdb.category_by_id)
+    names = [name for (name,) in tdb.execute(f"SELECT name FROM {REFERENCE_SCHEMA}.Category")]
+    for name in names:
+        _ = tdb.get_Category(name)
+    created = len(tdb.category_by_id) - known
+    counts["Category"] = (created, 0, len(names) - created)
+
+    # category names of the reference data -> ids of this database
+    tdb.execute("DROP TABLE IF EXISTS temp.import_category")
+    tdb.execute("CREATE TEMP TABLE import_category(name TEXT PRIMARY KEY, category_id INTEGER)")
+    tdb.execute(
+        "INSERT INTO temp.import_category VALUES(?,?)",
+        [
+            (name, category.category_id)
+            for (name,) in tdb.execute(f"SELECT DISTINCT category FROM {REFERENCE_SCHEMA}.Item").fetchall()
+            if (category := tdb.get_Category(name))
+        ],
+        many=True
+    )
+    for table_class in IMPORT_TABLES:
+        table_name = table_class.__name__
+        counts[table_name] = merge_table(tdb, table_class)
+        if sum(counts[table_name][:2]):
+            tdb.reload_table(table_name)
+            if table_class is Item:
+                tdb.reindex_ui_order()
+    tdb.execute("DROP TABLE temp.import_category")
+    return counts
+
+def merge_table(tdb: "TradeDB", table_class: type) -> tuple[int, int, int]:
+    """upsert the reference rows, only rows with a difference are written"""
+    stmts = get_statements(table_class)
+    table = stmts.table
+    columns = ",".join(stmts.columns)
+    keys = ",".join(stmts.key_columns)
+    upd_columns = [
+        column for column in stmts.value_columns if column not in IMPORT_KEEP_COLUMNS.get(table, ())
+    ]
+    select_columns = ",".join(
+        "c.category_id" if column == "category_id" else f"r.{column}" for column in stmts.columns
+    )
+    source = f"SELECT {select_columns} FROM {REFERENCE_SCHEMA}.{table} AS r"
+    if "category_id" in stmts.columns:
+        source += " JOIN temp.import_category AS c ON c.name = r.category"
+    (total,) = tdb.execute(f"SELECT count(*) FROM ({source})").fetchone()
+    (created,) = tdb.execute(
+        f"SELECT count(*) FROM ({source}) WHERE ({keys}) NOT IN (SELECT {keys} FROM main.{table})"
+    ).fetchone()
+    stmt = (
+        f"INSERT INTO main.{table}({columns}) {source} WHERE true"
+        f" ON CONFLICT({keys}) DO UPDATE SET "
+        + ",".join(f"{column}=excluded.{column}" for column in upd_columns)
+        + f" WHERE ({','.join(f'{table}.{column}' for column in upd_columns)})"
+        + f" IS NOT ({','.join(f'excluded.{column}' for column in upd_columns)})"
+    )
+    written = tdb.execute(stmt).rowcount
+    return created, written - created, total - written
+
+def read_csv_rows(data_file: str) -> list[dict[str, str]]:
+    with open(data_file, encoding="UTF-8", newline="") as csv_file:
+        return list(csv.DictReader(csv_file))
+
 def fill_RareItem_cache(tdb: "TradeDB", plugin_dir: str) -> None:
     if not tdb.is_connected:
         tdb.logger.info("Database not connected.")
@@ -71,39 +121,40 @@ def fill_RareItem_cache(tdb: "TradeDB", plugin_dir: str) -> None:
     tdb.rareitem_cache.clear()
     if not tdb.use_rareitem_cache:
         return
-    table_name = "RareItem"
-    import_file = os.path.join(plugin_dir, "data", f"{table_name}.csv")
-    if not os.path.isfile(import_file):
-        tdb.logger.warning(f"import file {import_file!r} not found")
-        return
-    tdb.logger.info(f"fill cache {import_file!r}")
-    with open(import_file, encoding="UTF-8", newline="") as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        for row in csv_reader:
-            if not (category := tdb.get_Category(row.pop("name@Category.category_id"))):
-                continue
-            row["category_id"] = category.category_id
-            rareitem: RareItem = convert_dict_to_class(RareItem, row)
-            if rareitem.rare_id in tdb.rareitem_by_id:
-                continue
-            if rareitem.station_id not in tdb.rareitem_cache:
-                tdb.rareitem_cache[rareitem.station_id] = []
-            tdb.rareitem_cache[rareitem.station_id].append(rareitem)
-        tdb.logger.debug(f"{tdb.rareitem_cache = }")
-    tdb.logger.info("cache filled")
+    columns = reference_columns(RareItem)
+    if reference_db := reference_db_path(plugin_dir):
+        tdb.logger.info(f"fill cache {reference_db!r}")
+        rows = read_reference(reference_db, f"SELECT {','.join(columns)} FROM RareItem")
+    else:
+        import_file = os.path.join(plugin_dir, "data", "RareItem.csv")
+        if not os.path.isfile(import_file):
+            tdb.logger.warning(f"import file {import_file!r} not found")
+            return
+        tdb.logger.info(f"fill cache {import_file!r}")
+        rows = [convert_csv_row(RareItem, row) for row in read_csv_rows(import_file)]
+    category_index = columns.index("category")
+    for row in rows:
+        if not (category := tdb.get_Category(row[category_index])):
+            continue
+        rareitem = RareItem(*row[:category_index], category.category_id, *row[category_index+1:])
+        if rareitem.rare_id in tdb.rareitem_by_id:
+            continue
+        if rareitem.station_id not in tdb.rareitem_cache:
+            tdb.rareitem_cache[rareitem.station_id] = []
+        tdb.rareitem_cache[rareitem.station_id].append(rareitem)
+    tdb.logger.info(f"cache filled, {len(tdb.rareitem_cache)} stations")
 
 def load_fdev_name_mapping(tdb: "TradeDB", plugin_dir: str) -> None:
     tdb.fdev_name_to_id.clear()
-    data_file = os.path.join(plugin_dir, "data", "FDevMap.csv")
-    if not os.path.isfile(data_file):
-        tdb.logger.warning(f"data file {data_file!r} not found")
-        return
-    tdb.logger.info(f"load fdev name to id mapping {data_file!r}")
-    with open(data_file, encoding="UTF-8", newline="") as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        tdb.fdev_name_to_id = {
-            row["fdev_name"].upper(): int(row["fdev_id"])
-            for row in csv_reader
-        }
-        tdb.logger.debug(f"{tdb.fdev_name_to_id = }")
+    if reference_db := reference_db_path(plugin_dir):
+        tdb.logger.info(f"load fdev name to id mapping {reference_db!r}")
+        rows = read_reference(reference_db, "SELECT fdev_name, fdev_id FROM FDevMap")
+    else:
+        data_file = os.path.join(plugin_dir, "data", "FDevMap.csv")
+        if not os.path.isfile(data_file):
+            tdb.logger.warning(f"data file {data_file!r} not found")
+            return
+        tdb.logger.info(f"load fdev name to id mapping {data_file!r}")
+        rows = ((row["fdev_name"], int(row["fdev_id"])) for row in read_csv_rows(data_file))
+    tdb.fdev_name_to_id = {fdev_name.upper(): fdev_id for fdev_name, fdev_id in rows}
     tdb.logger.info(f"{len(tdb.fdev_name_to_id)} mappings loaded")
@@ -0,0 +1,30 @@
+"""
+    Construction depot progress, see TradeDB.update_construction_depot()
+"""
+from typing import NamedTuple
+
+
+class DepotCommodity(NamedTuple):
+    """Progress of one commodity of a construction depot."""
+    required: int
+    provided: int
+    payment: int
+    complete: bool
+
+
+class DepotState(NamedTuple):
+    """Last written progress of a construction depot."""
+    timestamp: str
+    commodities: dict[int, DepotCommodity]
+
+
+def diff_depot(
+    old_commodities: dict[int, DepotCommodity], new_commodities: dict[int, DepotCommodity]
+) -> tuple[dict[int, DepotCommodity], set[int]]:
+    """new or changed commodities and the item ids no longer listed"""
+    changed = {
+        item_id: commodity
+        for item_id, commodity in new_commodities.items()
+        if old_commodities.get(item_id) != commodity
+    }
+    return changed, old_commodities.keys() - new_commodities.keys()
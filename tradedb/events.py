@@ -0,0 +1,74 @@
+"""
+    Translate journal events and CAPI data into TradeDB calls
+"""
+from typing import NamedTuple, Any
+
+
+class Action(NamedTuple):
+    """
+    One TradeDB method call derived from an event. Actions with the same
+    key write the same state, within the coalescing window of the writer
+    only the newest one is run.
+    """
+    name: str
+    method: str
+    args: tuple[Any, ...]
+    info: str
+    key: tuple[str, int] | None = None
+
+def journal_actions(entry: dict, cmdrname: str) -> list[Action]:
+    event = entry["event"]
+    actions = []
+    if event in {"FSDJump", "Location", "CarrierJump"}:
+        actions.append(Action(
+            event, "update_system", (entry, cmdrname), "Check system data from Jump / Location.",
+            ("system", entry["SystemAddress"])
+        ))
+        if event == "Location" and entry.get("Docked", False):
+            actions.append(Action(
+                event, "update_station", (entry,), "Check station data from Location.",
+                ("station", entry["MarketID"])
+            ))
+    elif event == "NavRoute":
+        route = [{"timestamp": entry["timestamp"], **hop} for hop in entry.get("Route", [])]
+        actions.append(Action(
+            event, "update_systems", (route, cmdrname), "Check system data from NavRoute."
+        ))
+    elif event == "Docked":
+        actions.append(Action(
+            event, "update_station", (entry,), "Check station data from Docked.",
+            ("station", entry["MarketID"])
+        ))
+    elif event == "ColonisationConstructionDepot":
+        actions.append(Action(
+            event, "update_construction_depot", (entry,), "Update construction depot data from Journal.",
+            ("depot", entry["MarketID"])
+        ))
+    elif event == "Market" and "Items" in entry:
+        # only the Market.json file contains the items
+        actions.append(Action(
+            event, "update_journal_market", (entry,), "Update market data from Market.json.",
+            ("market", entry["MarketID"])
+        ))
+    elif event == "Shipyard" and "PriceList" in entry:
+        actions.append(Action(
+            event, "update_journal_shipyard", (entry,), "Update shipyard data from Shipyard.json.",
+            ("shipyard", entry["MarketID"])
+        ))
+    elif event == "Outfitting" and "Items" in entry:
+        actions.append(Action(
+            event, "update_journal_outfitting", (entry,), "Update outfitting data from Outfitting.json.",
+            ("outfitting", entry["MarketID"])
+        ))
+    return actions
+
+def capi_actions(last_starport: dict) -> list[Action]:
+    if "requiredConstructionResources" in last_starport:
+        return [Action(
+            "CAPI depot", "update_construction_depot", (last_starport,),
+            "Update construction depot data from CAPI.", ("depot", last_starport["id"])
+        )]
+    return [Action(
+        "CAPI starport", "update_starport", (last_starport,), "Update starport data.",
+        ("starport", last_starport["id"])
+    )]
@@ -0,0 +1,174 @@
+"""
+    Fan-out of the events to several TradeDangerous databases
+"""
+import json
+import logging
+import sqlite3
+import time
+
+from typing import Self, Any, NamedTuple
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .tradedb import TradeDB
+from .writer import TradeDBWriter
+from .maintenance import Maintenance
+from .events import Action
+
+
+class TargetLag(NamedTuple):
+    """Backlog of one target database."""
+    queue_depth: int
+    dropped: int
+    lag_ms: float
+    failed: int
+    coalesced: int
+
+    def __str__(self: Self) -> str:
+        return (
+            f"queue depth: {self.queue_depth}, dropped: {self.dropped}"
+            f", lag: {self.lag_ms:.1f} ms, failed: {self.failed}, coalesced: {self.coalesced}"
+        )
+
+
+@dataclass
+class Target:
+    """A database with its own TradeDB (connection, caches) and writer thread."""
+    name: str
+    tdb: TradeDB
+    writer: TradeDBWriter
+    # the open job has run, see TradeDBFanout.open()
+    opened: bool = False
+
+    @property
+    def is_usable(self: Self) -> bool:
+        """events are queued until the database is opened, afterwards only with a connection"""
+        return not self.opened or self.tdb.is_connected
+
+    def get_lag(self: Self) -> TargetLag:
+        return TargetLag(
+            queue_depth = self.writer.queue_depth,
+            dropped = self.writer.dropped,
+            lag_ms = self.writer.lag_ms,
+            failed = sum(stats.failed for stats in self.writer.get_stats().values()),
+            coalesced = self.writer.coalesced,
+        )
+
+
+class TradeDBFanout:
+    """
+    Submits every action to all target databases. The first target is the
+    primary one (unbounded queue, settings dialog, import); the others get
+    a bounded queue and drop events when they fall behind, so a slow or
+    locked database never delays the other targets or the UI.
+    """
+
+    def __init__(self: Self, logger: logging.Logger):
+        self.logger = logger
+        self.targets: list[Target] = []
+
+    @property
+    def primary(self: Self) -> Target:
+        return self.targets[0]
+
+    @property
+    def is_usable(self: Self) -> bool:
+        return any(target.is_usable for target in self.targets)
+
+    def add_target(
+        self: Self, name: str, tdb: TradeDB, maxsize: int = 0, maintenance: Maintenance | None = None,
+        coalesce_ms: int = 0
+    ) -> Target:
+        writer = TradeDBWriter(
+            tdb, tdb.logger, maxsize, name=f"UpdateTD-Writer-{name}", maintenance=maintenance,
+            coalesce_ms=coalesce_ms
+        )
+        target = Target(name, tdb, writer)
+        self.targets.append(target)
+        return target
+
+    def start(self: Self) -> None:
+        for target in self.targets:
+            target.writer.start()
+
+    def open(self: Self, setup: Callable[[TradeDB], None]) -> None:
+        """
+        Connect and load every database on its writer thread, then run
+        setup(tdb). A database which fails is logged and its target skipped.
+        """
+        for target in self.targets:
+            target.writer.submit_control("Open", self._open_target, target, setup)
+
+    def _open_target(self: Self, target: Target, setup: Callable[[TradeDB], None]) -> None:
+        try:
+            target.tdb.connect()
+            if not target.tdb.is_connected:
+                # no database file, connect() logged why
+                target.tdb.logger.error(f"target {target.name} skipped, not connected")
+                return
+            target.tdb.load()
+            setup(target.tdb)
+        except (sqlite3.Error, OSError) as err:
+            target.tdb.logger.error(f"target {target.name} skipped, {target.tdb.db_filename!r}: {err}")
+            target.tdb.close()
+        finally:
+            target.opened = True
+
+    def submit(self: Self, name: str, func: Callable[[TradeDB], None]) -> None:
+        """queue func(tdb) for every target, never dropped by a full queue"""
+        for target in self.targets:
+            target.writer.submit_control(name, func, target.tdb)
+
+    def submit_action(self: Self, action: Action) -> None:
+        for target in self.targets:
+            if not target.is_usable:
+                continue
+            if action.key:
+                target.writer.submit_coalesced(
+                    action.key, action.name, self._run_action, target.tdb, action.method, *action.args
+                )
+            else:
+                target.writer.submit(action.name, self._run_action, target.tdb, action.method, *action.args)
+
+    @staticmethod
+    def _run_action(tdb: TradeDB, method: str, *args: Any) -> None:
+        # queued before the database turned out to be unusable
+        if tdb.is_connected:
+            getattr(tdb, method)(*args)
+
+    def get_lag(self: Self) -> dict[str, TargetLag]:
+        return {target.name: target.get_lag() for target in self.targets}
+
+    def log_lag(self: Self) -> None:
+        for name, lag in self.get_lag().items():
+            self.logger.info(f"target {name}: {lag}")
+
+    def get_profiles(self: Self) -> dict[str, dict[str, Any]]:
+        return {target.name: target.tdb.profiler.report() for target in self.targets}
+
+    def log_profiles(self: Self, top: int = 10) -> None:
+        for target in self.targets:
+            self.logger.info(f"target {target.name}: statements")
+            target.tdb.profiler.log_report(self.logger, top)
+
+    def dump_profiles(self: Self, filename: str) -> None:
+        """the profiler report of every target, keyed by target name"""
+        with open(filename, "w", encoding="UTF-8") as report_file:
+            json.dump(self.get_profiles(), report_file, indent=2)
+
+    def stop(self: Self, timeout: float | None = None) -> None:
+        """Stop all writers at once, the timeout applies to all of them together."""
+        for target in self.targets:
+            target.writer.request_stop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for target in self.targets:
+            target.writer.stop(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self.log_lag()
+
+    def close(self: Self) -> None:
+        for target in self.targets:
+            if target.writer.is_alive():
+                # the connection is still in use, the daemon thread ends with the process
+                target.tdb.logger.warning(f"target {target.name}: writer still running, not closed")
+                continue
+            target.tdb.close()
@@ -0,0 +1,96 @@
+"""
+    Index audit of the statements run on every dock, see TradeDB.connect()
+"""
+import sqlite3
+
+from typing import Self
+from dataclasses import dataclass, field
+
+from .tables import Station, System, StationItem, ShipVendor, UpgradeVendor
+from .statements import get_statements
+
+
+# tables read and replaced per station
+STATION_SERVICE_CLASSES = (StationItem, ShipVendor, UpgradeVendor)
+INDEX_PREFIX = "idx_updatetd_"
+
+
+@dataclass
+class IndexAudit:
+    """Result of audit_indexes()."""
+    statements: int = 0
+    # (statement, plan details of the full scans)
+    full_scans: list[tuple[str, list[str]]] = field(default_factory=list)
+    # tables without an index starting with station_id
+    missing: list[str] = field(default_factory=list)
+    # the statements creating the missing indexes
+    recommended: list[str] = field(default_factory=list)
+    created: list[str] = field(default_factory=list)
+
+    def __str__(self: Self) -> str:
+        return (
+            f"hot statements: {self.statements}, full scans: {len(self.full_scans)}"
+            f", missing station indexes: {', '.join(self.missing) or '-'}"
+            f", created: {', '.join(self.created) or '-'}"
+        )
+
+
+def hot_statements() -> list[str]:
+    statements = [get_statements(System).select_by_key, get_statements(Station).select_by_key]
+    for table_class in STATION_SERVICE_CLASSES:
+        stmts = get_statements(table_class)
+        statements.extend((
+            stmts.select_by_station,
+            stmts.delete_by_station,
+            f"SELECT max(modified) FROM {stmts.table} WHERE station_id = ?",
+            stmts.update_by_key,
+            stmts.delete_by_key,
+        ))
+    return statements
+
+def full_scans(conn: sqlite3.Connection, stmt: str) -> list[str]:
+    """the plan details which read a whole table"""
+    bind = (None,) * stmt.count("?")
+    return [
+        detail for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {stmt}", bind)
+        if detail.startswith("SCAN") and "INDEX" not in detail
+    ]
+
+def has_station_index(conn: sqlite3.Connection, table: str) -> bool:
+    """any full (not partial) index with station_id as first column, including the primary key"""
+    for _, index_name, _, _, partial in conn.execute(f"PRAGMA index_list({table})"):
+        if partial:
+            continue
+        first_column = conn.execute(f"PRAGMA index_info({index_name})").fetchone()
+        if first_column and first_column[2] == "station_id":
+            return True
+    return False
+
+def station_index_stmt(table_class: type) -> str:
+    """the station access path, covering the key"""
+    stmts = get_statements(table_class)
+    columns = ("station_id", *(column for column in stmts.key_columns if column != "station_id"))
+    return (
+        f"CREATE INDEX IF NOT EXISTS {INDEX_PREFIX}{stmts.table.lower()}_station"
+        f" ON {stmts.table}({','.join(columns)})"
+    )
+
+def audit_indexes(conn: sqlite3.Connection, create: bool = False) -> IndexAudit:
+    """check the station indexes (creating missing ones if wanted) and the plans of the hot statements"""
+    audit = IndexAudit()
+    for table_class in STATION_SERVICE_CLASSES:
+        table = table_class.__name__
+        if has_station_index(conn, table):
+            continue
+        if create:
+            conn.execute(station_index_stmt(table_class))
+            conn.commit()
+            audit.created.append(table)
+        else:
+            audit.missing.append(table)
+            audit.recommended.append(station_index_stmt(table_class))
+    for stmt in hot_statements():
+        audit.statements += 1
+        if details := full_scans(conn, stmt):
+            audit.full_scans.append((stmt, details))
+    return audit
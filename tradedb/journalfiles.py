@@ -0,0 +1,157 @@
+"""
+    Convert the companion files of the journal folder (Market.json, ...)
+    into the CAPI format used by TradeDB.
+"""
+import json
+import queue
+import logging
+import os.path
+import threading
+
+from typing import Self, Any
+from collections.abc import Callable
+
+from .const import REGEX_NORMALIZE_NAME, MARKET_CATEGORY_MAP
+
+
+# journal events with a file of the same name in the journal folder
+COMPANION_EVENTS = {"Market", "Shipyard", "Outfitting"}
+
+
+def normalize_name(name: str) -> str:
+    """'$hydrogenfuel_name;' -> 'hydrogenfuel'"""
+    return REGEX_NORMALIZE_NAME.match(name).group("name")
+
+def market_category_name(category: str) -> str:
+    """'$MARKET_category_consumer_items;' -> 'Consumer Items' (CAPI categoryname)"""
+    name = category.strip("$;")
+    if name.upper().startswith("MARKET_CATEGORY_"):
+        name = name[len("MARKET_category_"):]
+    return MARKET_CATEGORY_MAP.get(name.lower(), name.replace("_", " ").title())
+
+def market_to_capi(data: dict[str, Any], fdev_name_to_id: dict[str, int]) -> dict[str, Any]:
+    commodities = []
+    for item in data.get("Items", []):
+        fdev_name = normalize_name(item["Name"])
+        if not (item_id := item.get("id", fdev_name_to_id.get(fdev_name.upper()))):
+            continue
+        commodities.append({
+            "id": item_id,
+            "name": fdev_name,
+            "locName": item.get("Name_Localised", fdev_name),
+            "categoryname": market_category_name(item["Category"]),
+            "meanPrice": item.get("MeanPrice", 0),
+            "buyPrice": item.get("BuyPrice", 0),
+            "sellPrice": item.get("SellPrice", 0),
+            "stock": item.get("Stock", 0),
+            "stockBracket": item.get("StockBracket", 0),
+            "demand": item.get("Demand", 0),
+            "demandBracket": item.get("DemandBracket", 0),
+        })
+    return {
+        "id": data["MarketID"],
+        "timestamp": data["timestamp"],
+        "commodities": commodities,
+    }
+
+def shipyard_to_capi(data: dict[str, Any], fdev_name_to_id: dict[str, int]) -> dict[str, Any]:
+    ships = []
+    for ship in data.get("PriceList", []):
+        if not (ship_id := ship.get("id", fdev_name_to_id.get(ship["ShipType"].upper()))):
+            continue
+        ships.append({
+            "id": ship_id,
+            "name": ship["ShipType"],
+            "basevalue": ship.get("ShipPrice", 0),
+        })
+    return {
+        "id": data["MarketID"],
+        "timestamp": data["timestamp"],
+        "ships": {"shipyard_list": ships},
+    }
+
+def outfitting_to_capi(data: dict[str, Any], fdev_name_to_id: dict[str, int]) -> dict[str, Any]:
+    modules = []
+    for module in data.get("Items", []):
+        if not (module_id := module.get("id", fdev_name_to_id.get(module["Name"].upper()))):
+            continue
+        modules.append({
+            "id": module_id,
+            "name": module["Name"],
+        })
+    return {
+        "id": data["MarketID"],
+        "timestamp": data["timestamp"],
+        "modules": modules,
+    }
+
+
+class CompanionFiles:
+    """
+    Reads Market.json, Shipyard.json and Outfitting.json for their journal
+    event. A file is only read if its modification time or size changed
+    and only used if it belongs to the event (same timestamp and market).
+    """
+
+    def __init__(self: Self, logger: logging.Logger):
+        self.logger = logger
+        self.file_keys: dict[str, tuple[int, int]] = {}
+
+    def read(self: Self, journal_dir: str, entry: dict[str, Any]) -> dict[str, Any] | None:
+        if entry.get("event") not in COMPANION_EVENTS:
+            return None
+        filename = os.path.join(journal_dir, f"{entry['event']}.json")
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            self.logger.debug(f"{filename!r} not found")
+            return None
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        if self.file_keys.get(filename) == file_key:
+            self.logger.debug(f"{filename!r} unchanged")
+            return None
+        try:
+            with open(filename, "rb") as json_file:
+                data = json.load(json_file)
+        except (OSError, ValueError) as err:
+            # the game may still be writing it
+            self.logger.info(f"{filename!r} not readable: {err}")
+            return None
+        if (data.get("timestamp"), data.get("MarketID")) != (entry.get("timestamp"), entry.get("MarketID")):
+            self.logger.info(f"{filename!r} does not belong to the {entry['event']} event")
+            return None
+        self.file_keys[filename] = file_key
+        return data
+
+
+class CompanionReader(threading.Thread):
+    """
+    Reads the companion files of the journal events on its own thread and
+    hands the data to on_data(data, cmdrname). Neither the UI thread nor a
+    writer waits for the (large) files.
+    """
+
+    def __init__(self: Self, logger: logging.Logger, on_data: Callable[[dict[str, Any], str], None]):
+        super().__init__(name="UpdateTD-CompanionReader", daemon=True)
+        self.logger = logger
+        self.on_data = on_data
+        self.files = CompanionFiles(logger)
+        self.queue: queue.Queue[tuple[str, dict[str, Any], str] | None] = queue.Queue()
+
+    def submit(self: Self, journal_dir: str, entry: dict[str, Any], cmdrname: str) -> None:
+        self.queue.put_nowait((journal_dir, entry, cmdrname))
+
+    def run(self: Self) -> None:
+        while (job := self.queue.get()) is not None:
+            journal_dir, entry, cmdrname = job
+            try:
+                if data := self.files.read(journal_dir, entry):
+                    self.on_data(data, cmdrname)
+            except Exception:
+                self.logger.exception(f"{entry['event']}.json failed")
+
+    def stop(self: Self, timeout: float | None = None) -> None:
+        """read the queued files, then stop"""
+        if self.is_alive():
+            self.queue.put_nowait(None)
+            self.join(timeout)
@@ -0,0 +1,131 @@
+"""
+    WAL checkpoints and PRAGMA optimize, run by the writer thread
+"""
+import logging
+import os.path
+import sqlite3
+import time
+
+from typing import Self
+from dataclasses import dataclass
+
+from .tradedb import TradeDB
+
+
+@dataclass
+class CheckpointStats:
+    """Durations of the checkpoints of one mode and the WAL sizes seen before them."""
+    count: int = 0
+    busy: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_wal_bytes: int = 0
+    max_wal_bytes: int = 0
+
+    def add(self: Self, time_ms: float, busy: bool, wal_bytes: int) -> None:
+        self.count += 1
+        if busy:
+            self.busy += 1
+        self.total_ms += time_ms
+        self.max_ms = max(self.max_ms, time_ms)
+        self.last_wal_bytes = wal_bytes
+        self.max_wal_bytes = max(self.max_wal_bytes, wal_bytes)
+
+    def __str__(self: Self) -> str:
+        avg_ms = self.total_ms / self.count if self.count else 0.0
+        return (
+            f"count: {self.count}, busy: {self.busy}, time avg/max: {avg_ms:.1f}/{self.max_ms:.1f} ms"
+            f", WAL last/max: {self.last_wal_bytes / 2**20:.1f}/{self.max_wal_bytes / 2**20:.1f} MiB"
+        )
+
+
+class Maintenance:
+    """
+    Keeps the WAL file of a TradeDB small: a passive checkpoint after the
+    writer was idle for idle_s seconds and after every job once the WAL grows
+    beyond wal_limit_bytes. A truncating checkpoint waits for the readers
+    (busy_timeout), so it only runs in the next idle period after the WAL
+    grew too big, at most once per idle period, and at the end together
+    with PRAGMA optimize.
+    Only the writer thread may call it, it uses the TradeDB connection.
+    """
+
+    def __init__(
+        self: Self, tdb: TradeDB, logger: logging.Logger,
+        idle_s: float | None = 30.0, wal_limit_bytes: int | None = 64 * 2**20
+    ):
+        self.tdb = tdb
+        self.logger = logger
+        self.idle_s = idle_s or None
+        self.wal_limit_bytes = wal_limit_bytes or None
+        self.stats: dict[str, CheckpointStats] = {}
+        # something was written since the last checkpoint
+        self.pending = False
+        # the WAL grew beyond wal_limit_bytes, truncate it when idle
+        self.oversized = False
+
+    @property
+    def wal_filename(self: Self) -> str:
+        return f"{self.tdb.db_filename}-wal"
+
+    def wal_size(self: Self) -> int:
+        try:
+            return os.path.getsize(self.wal_filename)
+        except OSError:
+            return 0
+
+    def checkpoint(self: Self, mode: str = "PASSIVE") -> bool:
+        """returns False if the checkpoint could not be completed"""
+        if not self.tdb.is_connected or self.tdb.tx_depth:
+            return False
+        wal_bytes = self.wal_size()
+        time_ms = time.perf_counter()*-1000
+        try:
+            busy, wal_frames, done_frames = self.tdb.conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.Error as err:
+            self.logger.warning(f"{mode} checkpoint failed: {err}")
+            return False
+        time_ms += time.perf_counter()*1000
+        busy = bool(busy) or done_frames < wal_frames
+        if mode not in self.stats:
+            self.stats[mode] = CheckpointStats()
+        self.stats[mode].add(time_ms, busy, wal_bytes)
+        self.logger.debug(
+            f"{mode} checkpoint {time_ms:.1f} ms, WAL {wal_bytes} bytes"
+            f", frames {done_frames}/{wal_frames}{' (busy)' if busy else ''}"
+        )
+        self.pending = busy
+        return not busy
+
+    def on_idle(self: Self) -> None:
+        if self.oversized:
+            # one try per idle period, after_job() sets it again
+            self.oversized = False
+            self.checkpoint("TRUNCATE")
+        elif self.pending:
+            self.checkpoint("PASSIVE")
+
+    def after_job(self: Self) -> None:
+        self.pending = True
+        if self.wal_limit_bytes and (wal_bytes := self.wal_size()) > self.wal_limit_bytes:
+            if not self.oversized:
+                self.logger.info(f"WAL size {wal_bytes} bytes over limit, checkpoint")
+            self.oversized = True
+            self.checkpoint("PASSIVE")
+
+    def on_stop(self: Self) -> None:
+        self.checkpoint("TRUNCATE")
+        if self.tdb.is_connected:
+            time_ms = time.perf_counter()*-1000
+            try:
+                self.tdb.conn.execute("PRAGMA optimize")
+            except sqlite3.Error as err:
+                self.logger.warning(f"PRAGMA optimize failed: {err}")
+            time_ms += time.perf_counter()*1000
+            self.logger.info(f"PRAGMA optimize {time_ms:.1f} ms")
+        self.log_stats()
+
+    def log_stats(self: Self) -> None:
+        self.logger.info(f"WAL size: {self.wal_size()} bytes")
+        for mode, stats in sorted(self.stats.items()):
+            self.logger.info(f"{mode} checkpoint: {stats}")
@@ -0,0 +1,64 @@
+"""
+    Batched conversion of the CAPI commodities into StationItem rows
+"""
+from typing import Any, NamedTuple
+
+from .misc import make_number
+
+
+# CAPI keys of the StationItem price columns, in column order
+PRICE_KEYS = ("sellPrice", "demand", "demandBracket", "buyPrice", "stock", "stockBracket")
+
+
+class CommodityRef(NamedTuple):
+    """Resolution table entry of a CAPI commodity id."""
+    item_id: int | None
+    category_id: int | None
+    is_rare: bool
+
+
+def int_column(values: list[Any]) -> list[int]:
+    """convert the whole column, value by value (make_number) only if that fails"""
+    try:
+        return list(map(int, values))
+    except (ValueError, TypeError):
+        return [make_number(value) for value in values]
+
+def price_columns(entries: list[dict[str, Any]]) -> list[list[int]]:
+    return [int_column([entry[key] for entry in entries]) for key in PRICE_KEYS]
+
+def station_item_rows(
+    station_id: int, timestamp: str, item_ids: list[int], columns: list[list[int]]
+) -> list[tuple]:
+    """
+    StationItem bind rows, the bracket rules of the single entry version
+    applied column by column. Pure Python, numpy is not available in EDMC.
+    """
+    demand_price, demand_units, demand_level, supply_price, supply_units, supply_level = columns
+
+    # there should only be supply or demand, save it anyway (ed bug)
+    # reset level based on units
+    both = [bool(sl and dl) for sl, dl in zip(supply_level, demand_level)]
+    supply_level = [0 if b and not u else lvl for b, u, lvl in zip(both, supply_units, supply_level)]
+    demand_level = [0 if b and not u else lvl for b, u, lvl in zip(both, demand_units, demand_level)]
+
+    # if there is no stockBracket ignore supply
+    supply_price = [p if sl else 0 for p, sl in zip(supply_price, supply_level)]
+    supply_units = [u if sl else 0 for u, sl in zip(supply_units, supply_level)]
+
+    # with supply: no price means you can not sell it, else you can still sell it without demand
+    demand_units = [
+        (-1 if p else 0) if sl else u for u, p, sl in zip(demand_units, demand_price, supply_level)
+    ]
+    demand_level = [
+        (-1 if p else 0) if sl else lvl for lvl, p, sl in zip(demand_level, demand_price, supply_level)
+    ]
+
+    # neither supply nor demand: not on the market, just in ship cargo
+    return [
+        (station_id, item_id, dp, du, dl, sp, su, sl, timestamp, 0)
+        for item_id, dp, du, dl, sp, su, sl in zip(
+            item_ids, demand_price, demand_units, demand_level, supply_price, supply_units, supply_level
+        )
+        if sl or dl
+    ]
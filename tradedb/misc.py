@@ -1,9 +1,8 @@
 from typing import Any
 from collections.abc import Iterable, Callable
-from dataclasses import dataclass, fields
+from itertools import islice
 
 from .const import REGEX_NORMALIZE_NAME
-from .tables import Station, Item, StationItem
 
 
 def snap_to_grid(val: float) -> float:
@@ -22,60 +21,17 @@ def make_number(
         ret = default
     return ret
 
-def get_field_names(data_class: dataclass) -> tuple[str]:
-    return tuple(field.name.rstrip("_") for field in fields(data_class))
-
-def convert_dict_to_class(data_class: dataclass, row: dict) -> dataclass:
-    args = (
-        field.type(row[field.name.rstrip("_")]) if row.get(field.name.rstrip("_")) else None
-        for field in fields(data_class)
-    )
-    return data_class(*args)
+def chunked(values: Iterable[Any], size: int) -> Iterable[tuple[Any, ...]]:
+    """split values into tuples of at most size elements"""
+    values = iter(values)
+    while chunk := tuple(islice(values, size)):
+        yield chunk
 
 def get_from_StationServices(service_list: Iterable[str], key: str):
     if service_list is None:
         return "?"
     return "Y" if key.upper() in service_list else "N"
 
-def convert_entry_to_StationItem(
-        station: Station, item: Item, timestamp: str, entry: dict[str, Any]
-) -> StationItem | None:
-    demand_price = make_number(entry["sellPrice"])
-    demand_units = make_number(entry["demand"])
-    demand_level = make_number(entry["demandBracket"])
-    supply_price = make_number(entry["buyPrice"])
-    supply_units = make_number(entry["stock"])
-    supply_level = make_number(entry["stockBracket"])
-
-    if supply_level and demand_level:
-        # there should only be supply or demmand, save it anyway (ed bug)
-        # reset level based on units
-        if supply_units == 0:
-            supply_level = 0
-        if demand_units == 0:
-            demand_level = 0
-
-    if supply_level == 0:
-        if demand_level == 0:
-            # not on the market, just in ship cargo
-            return None
-        # If there is no stockBracket ignore supply
-        supply_price = 0
-        supply_units = 0
-    elif demand_price == 0:
-        # no price means you can not sell it
-        demand_units = 0
-        demand_level = 0
-    else:
-        # you can still sell it without demand
-        demand_units = -1
-        demand_level = -1
-
-    return StationItem(
-        station.station_id, item.item_id, demand_price, demand_units, demand_level,
-        supply_price, supply_units, supply_level, modified=timestamp, from_live=0
-    )
-
 def list_or_dict_iterator(data: dict[str, Any] | list[Any]) -> Iterable[Any]:
     if isinstance(data, dict):
         yield from data.values()
@@ -115,19 +71,3 @@ def build_update_stmt(tbl_name: str, columns: Iterable[str], *columns_id: str) -
         f"UPDATE {tbl_name} SET {'=?,'.join(column.rstrip('_') for column in columns)}=?"
         f" WHERE {'=? AND '.join(columns_id)}=?"
     )
-
-def insert_from_dict(
-        tbl_name: str, ins_columns: dict[str, Any], replace: bool=False
-) -> tuple[str, str | int | float | None]:
-    columns, bind = zip(*[col_pair for col_pair in ins_columns.items()])
-    stmt = build_insert_stmt(tbl_name, columns, replace=replace)
-    return stmt, bind
-
-def update_from_dict(
-        tbl_name: str, upd_columns: dict[str, Any], **id_columns: Any
-) -> tuple[str, str | int | float | None]:
-    columns, bind = zip(*[col_pair for col_pair in upd_columns.items()])
-    columns_id, bind_id = zip(*[col_pair for col_pair in id_columns.items()])
-    bind += bind_id
-    stmt = build_update_stmt(tbl_name, columns, *columns_id)
-    return stmt, bind
@@ -0,0 +1,116 @@
+"""
+    Statement level profiling for TradeDB.execute
+"""
+import re
+import logging
+import threading
+import functools
+
+from typing import Self, Any
+from collections import deque
+from dataclasses import dataclass, field
+
+
+REGEX_WHITESPACE = re.compile(r"\s+")
+REGEX_IN_LIST = re.compile(r"\bIN\s*\((\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=1024)
+def normalize_stmt(stmt: str) -> str:
+    """collapse whitespace and variable length IN (?,...) lists, cached: the statement texts repeat"""
+    stmt = REGEX_WHITESPACE.sub(" ", stmt).strip()
+    return REGEX_IN_LIST.sub("IN (...)", stmt)
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+@dataclass
+class StatementStats:
+    """Aggregated timing of one normalized statement."""
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    samples: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def add(self: Self, time_ms: float, rows: int) -> None:
+        self.count += 1
+        self.total_ms += time_ms
+        self.max_ms = max(self.max_ms, time_ms)
+        if rows > 0:
+            self.rows += rows
+        self.samples.append(time_ms)
+
+    def as_dict(self: Self) -> dict[str, Any]:
+        samples = list(self.samples)
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+        }
+
+
+@dataclass(frozen=True)
+class SlowQuery:
+    time_ms: float
+    stmt: str
+    bind: str
+    plan: tuple[str, ...] | None = None
+
+
+class StatementProfiler:
+    """Collects per statement timings and a log of slow statements."""
+
+    def __init__(self: Self, slow_ms: float = 100.0, explain: bool = False, slow_log_size: int = 100):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.stats: dict[str, StatementStats] = {}
+        self.slow_log: deque[SlowQuery] = deque(maxlen=slow_log_size)
+        self.lock = threading.Lock()
+
+    def is_slow(self: Self, time_ms: float) -> bool:
+        return 0 < self.slow_ms <= time_ms
+
+    def record(self: Self, stmt: str, time_ms: float, rows: int) -> None:
+        key = normalize_stmt(stmt)
+        with self.lock:
+            if key not in self.stats:
+                self.stats[key] = StatementStats()
+            self.stats[key].add(time_ms, rows)
+
+    def record_slow(
+        self: Self, stmt: str, time_ms: float, bind: Any, plan: tuple[str, ...] | None = None
+    ) -> SlowQuery:
+        # keep the repr short, executemany binds can be huge
+        bind_text = repr(bind)
+        if len(bind_text) > 200:
+            bind_text = f"{bind_text[:200]}..."
+        slow_query = SlowQuery(round(time_ms, 3), normalize_stmt(stmt), bind_text, plan)
+        with self.lock:
+            self.slow_log.append(slow_query)
+        return slow_query
+
+    def report(self: Self) -> dict[str, Any]:
+        with self.lock:
+            statements = {stmt: stats.as_dict() for stmt, stats in self.stats.items()}
+            slow_log = [vars(slow_query) for slow_query in self.slow_log]
+        return {
+            "slow_ms": self.slow_ms,
+            "statements": dict(sorted(
+                statements.items(), key=lambda item: item[1]["total_ms"], reverse=True
+            )),
+            "slow_log": slow_log,
+        }
+
+    def log_report(self: Self, logger: logging.Logger, top: int = 10) -> None:
+        report = self.report()
+        for stmt, stats in list(report["statements"].items())[:top]:
+            logger.info(f"{stats}: {stmt}")
+        if report["slow_log"]:
+            logger.info(f"{len(report['slow_log'])} statements slower than {self.slow_ms} ms")
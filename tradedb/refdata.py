@@ -0,0 +1,102 @@
+"""
+    Precompiled reference data: the data/*.csv files as typed SQLite tables
+    (data/reference.db), built by tools/gen_data.py and make_zip.py.
+"""
+import csv
+import sqlite3
+import functools
+import os.path
+
+from pathlib import Path
+from contextlib import closing
+from dataclasses import fields
+
+from .tables import Item, RareItem, Ship, Upgrade
+
+
+REFERENCE_DB = "reference.db"
+# stored as user_version, bump on every layout change
+REFERENCE_VERSION = 1
+# category names are kept, the ids differ between databases
+CATEGORY_COLUMN = "name@Category.category_id"
+REFERENCE_CLASSES = (Item, RareItem, Ship, Upgrade)
+
+
+def reference_columns(table_class: type) -> tuple[str, ...]:
+    return tuple(
+        "category" if field.name == "category_id" else field.name.rstrip("_")
+        for field in fields(table_class)
+    )
+
+def create_reference_tables(conn: sqlite3.Connection, schema: str = "main") -> None:
+    conn.execute(f"CREATE TABLE {schema}.Category(name TEXT PRIMARY KEY)")
+    conn.execute(f"CREATE TABLE {schema}.FDevMap(fdev_id INTEGER PRIMARY KEY, fdev_name TEXT)")
+    for table_class in REFERENCE_CLASSES:
+        columns = reference_columns(table_class)
+        conn.execute(
+            f"CREATE TABLE {schema}.{table_class.__name__}({','.join(columns)}, PRIMARY KEY({columns[0]}))"
+        )
+
+def convert_csv_row(table_class: type, row: dict[str, str]) -> tuple:
+    return tuple(
+        row[CATEGORY_COLUMN] if field.name == "category_id"
+        else field.type(value) if (value := row.get(field.name.rstrip("_"))) else None
+        for field in fields(table_class)
+    )
+
+def read_csv(data_dir: str, table_name: str) -> list[dict[str, str]]:
+    with open(os.path.join(data_dir, f"{table_name}.csv"), encoding="UTF-8", newline="") as csv_file:
+        return list(csv.DictReader(csv_file))
+
+def fill_reference_tables(conn: sqlite3.Connection, data_dir: str, schema: str = "main") -> None:
+    """load the csv files of data_dir, missing files leave the table empty"""
+    def rows(table_name, convert):
+        if not os.path.isfile(os.path.join(data_dir, f"{table_name}.csv")):
+            return []
+        return (convert(row) for row in read_csv(data_dir, table_name))
+
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {schema}.Category VALUES(?)", rows("Category", lambda row: (row["name"],))
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {schema}.FDevMap VALUES(?,?)",
+        rows("FDevMap", lambda row: (int(row["fdev_id"]), row["fdev_name"]))
+    )
+    for table_class in REFERENCE_CLASSES:
+        table_name = table_class.__name__
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {schema}.{table_name}"
+            f" VALUES({','.join('?' * len(fields(table_class)))})",
+            rows(table_name, functools.partial(convert_csv_row, table_class))
+        )
+
+def build_reference_db(data_dir: str, filename: str | None = None) -> str:
+    """(re)create the reference database from the csv files, returns its filename"""
+    filename = filename or os.path.join(data_dir, REFERENCE_DB)
+    tmp_filename = f"{filename}.tmp"
+    Path(tmp_filename).unlink(missing_ok=True)
+    with closing(sqlite3.connect(tmp_filename)) as conn:
+        conn.execute("PRAGMA journal_mode=OFF")
+        with conn:
+            create_reference_tables(conn)
+            fill_reference_tables(conn, data_dir)
+            conn.execute(f"PRAGMA user_version={REFERENCE_VERSION}")
+        conn.execute("VACUUM")
+    os.replace(tmp_filename, filename)
+    return filename
+
+def reference_db_path(plugin_dir: str) -> str | None:
+    """the reference database of the plugin if it exists and has the current version"""
+    filename = os.path.join(plugin_dir, "data", REFERENCE_DB)
+    if not os.path.isfile(filename):
+        return None
+    try:
+        [(version,)] = read_reference(filename, "PRAGMA user_version")
+    except sqlite3.Error:
+        return None
+    return filename if version == REFERENCE_VERSION else None
+
+def read_reference(filename: str, stmt: str) -> list[tuple]:
+    uri = f"{Path(filename).resolve().as_uri()}?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        return conn.execute(stmt).fetchall()
@@ -0,0 +1,96 @@
+"""
+    Precomputed SQL statements and row converters for the table dataclasses
+"""
+import functools
+
+from typing import Any
+from collections.abc import Callable
+from dataclasses import dataclass, fields
+from operator import attrgetter
+
+from .misc import build_insert_stmt, build_update_stmt
+
+
+PRIMARY_KEYS = {
+    "Added": ("added_id",),
+    "Category": ("category_id",),
+    "Item": ("item_id",),
+    "RareItem": ("rare_id",),
+    "Ship": ("ship_id",),
+    "ShipVendor": ("ship_id", "station_id"),
+    "Station": ("station_id",),
+    "StationItem": ("station_id", "item_id"),
+    "System": ("system_id",),
+    "Upgrade": ("upgrade_id",),
+    "UpgradeVendor": ("upgrade_id", "station_id"),
+}
+
+@dataclass(frozen=True)
+class TableStatements:
+    """Statements and converters of one table, see get_statements()."""
+    table: str
+    columns: tuple[str, ...]
+    key_columns: tuple[str, ...]
+    value_columns: tuple[str, ...]
+    select: str
+    select_by_key: str
+    insert: str
+    upsert: str
+    update_by_key: str
+    delete_by_key: str
+    select_by_station: str | None
+    delete_by_station: str | None
+    # entry -> all columns (the generated to_row)
+    to_row: Callable[[Any], tuple]
+    # entry -> value columns + key columns, the bind order of update_by_key
+    to_update_row: Callable[[Any], tuple]
+
+    def index(self, column: str) -> int:
+        return self.columns.index(column)
+
+@functools.cache
+def get_statements(tbl_class: type) -> TableStatements:
+    """build the statements of a table class once"""
+    table = tbl_class.__name__
+    field_names = tuple(field.name for field in fields(tbl_class))
+    columns = tuple(name.rstrip("_") for name in field_names)
+    key_columns = PRIMARY_KEYS.get(table, columns[:1])
+    value_columns = tuple(column for column in columns if column not in key_columns)
+    key_fields = tuple(field_names[columns.index(column)] for column in key_columns)
+    value_fields = tuple(field_names[columns.index(column)] for column in value_columns)
+    key_where = " AND ".join(f"{column} = ?" for column in key_columns)
+    select = f"SELECT {','.join(columns)} FROM {table}"
+    insert = build_insert_stmt(table, columns)
+    if "station_id" in columns:
+        select_by_station = f"{select} WHERE station_id = ?"
+        delete_by_station = f"DELETE FROM {table} WHERE station_id = ?"
+    else:
+        select_by_station = delete_by_station = None
+    return TableStatements(
+        table = table,
+        columns = columns,
+        key_columns = key_columns,
+        value_columns = value_columns,
+        select = select,
+        select_by_key = f"{select} WHERE {key_where}",
+        insert = insert,
+        upsert = (
+            f"{insert} ON CONFLICT({','.join(key_columns)}) DO UPDATE SET "
+            + ",".join(f"{column}=excluded.{column}" for column in value_columns)
+        ),
+        update_by_key = build_update_stmt(table, value_columns, *key_columns),
+        delete_by_key = f"DELETE FROM {table} WHERE {key_where}",
+        select_by_station = select_by_station,
+        delete_by_station = delete_by_station,
+        to_row = tbl_class.to_row,
+        to_update_row = attrgetter(*value_fields, *key_fields),
+    )
+
+@functools.cache
+def get_upsert(tbl_class: type, columns: frozenset[str]) -> str:
+    """insert a whole row, on a key conflict only the given value columns are updated"""
+    stmts = get_statements(tbl_class)
+    return (
+        f"{stmts.insert} ON CONFLICT({','.join(stmts.key_columns)}) DO UPDATE SET "
+        + ",".join(f"{column}=excluded.{column}" for column in stmts.value_columns if column in columns)
+    )
@@ -1,8 +1,10 @@
 """
-   auto generated on 2025-04-12T06:53:15Z
+   generated by tools/make_dataclasses.py on 2025-04-12T06:53:15Z
    database file: tools/TradeDangerous.db
+   change the generator and run it again instead of editing this file
 """
 
+from typing import Self, Any
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
@@ -19,19 +21,57 @@ def CURRENT_TIMESTAMP():
     return now().isoformat(sep = " ")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Added:
     """TradeDangerous "Added" table"""
     added_id: int
     name: str = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.added_id,
+            self.name,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.added_id != other.added_id:
+            changed["added_id"] = other.added_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class Category:
     """TradeDangerous "Category" table"""
     category_id: int
     name: str = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.category_id,
+            self.name,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.category_id != other.category_id:
+            changed["category_id"] = other.category_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class FDevOutfitting:
     """TradeDangerous "FDevOutfitting" table"""
     id: int
@@ -45,7 +85,50 @@ class FDevOutfitting:
     rating: str = None
     entitlement: str = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.id,
+            self.symbol,
+            self.category,
+            self.name,
+            self.mount,
+            self.guidance,
+            self.ship,
+            self.class_,
+            self.rating,
+            self.entitlement,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.id != other.id:
+            changed["id"] = other.id
+        if self.symbol != other.symbol:
+            changed["symbol"] = other.symbol
+        if self.category != other.category:
+            changed["category"] = other.category
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.mount != other.mount:
+            changed["mount"] = other.mount
+        if self.guidance != other.guidance:
+            changed["guidance"] = other.guidance
+        if self.ship != other.ship:
+            changed["ship"] = other.ship
+        if self.class_ != other.class_:
+            changed["class"] = other.class_
+        if self.rating != other.rating:
+            changed["rating"] = other.rating
+        if self.entitlement != other.entitlement:
+            changed["entitlement"] = other.entitlement
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class FDevShipyard:
     """TradeDangerous "FDevShipyard" table"""
     id: int
@@ -53,7 +136,32 @@ class FDevShipyard:
     name: str = None
     entitlement: str = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.id,
+            self.symbol,
+            self.name,
+            self.entitlement,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.id != other.id:
+            changed["id"] = other.id
+        if self.symbol != other.symbol:
+            changed["symbol"] = other.symbol
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.entitlement != other.entitlement:
+            changed["entitlement"] = other.entitlement
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class Item:
     """TradeDangerous "Item" table"""
     item_id: int
@@ -63,7 +171,38 @@ class Item:
     avg_price: int = None
     fdev_id: int = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.item_id,
+            self.name,
+            self.category_id,
+            self.ui_order,
+            self.avg_price,
+            self.fdev_id,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.item_id != other.item_id:
+            changed["item_id"] = other.item_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.category_id != other.category_id:
+            changed["category_id"] = other.category_id
+        if self.ui_order != other.ui_order:
+            changed["ui_order"] = other.ui_order
+        if self.avg_price != other.avg_price:
+            changed["avg_price"] = other.avg_price
+        if self.fdev_id != other.fdev_id:
+            changed["fdev_id"] = other.fdev_id
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class RareItem:
     """TradeDangerous "RareItem" table"""
     rare_id: int
@@ -75,21 +214,102 @@ class RareItem:
     illegal: str = '?'
     suppressed: str = '?'
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.rare_id,
+            self.station_id,
+            self.category_id,
+            self.name,
+            self.cost,
+            self.max_allocation,
+            self.illegal,
+            self.suppressed,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.rare_id != other.rare_id:
+            changed["rare_id"] = other.rare_id
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.category_id != other.category_id:
+            changed["category_id"] = other.category_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.cost != other.cost:
+            changed["cost"] = other.cost
+        if self.max_allocation != other.max_allocation:
+            changed["max_allocation"] = other.max_allocation
+        if self.illegal != other.illegal:
+            changed["illegal"] = other.illegal
+        if self.suppressed != other.suppressed:
+            changed["suppressed"] = other.suppressed
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class Ship:
     """TradeDangerous "Ship" table"""
     ship_id: int
     name: str = None
     cost: int = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.ship_id,
+            self.name,
+            self.cost,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.ship_id != other.ship_id:
+            changed["ship_id"] = other.ship_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.cost != other.cost:
+            changed["cost"] = other.cost
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class ShipVendor:
     """TradeDangerous "ShipVendor" table"""
     ship_id: int
     station_id: int
     modified: str = field(default_factory = CURRENT_TIMESTAMP)
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.ship_id,
+            self.station_id,
+            self.modified,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.ship_id != other.ship_id:
+            changed["ship_id"] = other.ship_id
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class Station:
     """TradeDangerous "Station" table"""
     station_id: int
@@ -108,7 +328,65 @@ class Station:
     planetary: str = '?'
     type_id: int = 0
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.station_id,
+            self.name,
+            self.system_id,
+            self.ls_from_star,
+            self.blackmarket,
+            self.max_pad_size,
+            self.market,
+            self.shipyard,
+            self.modified,
+            self.outfitting,
+            self.rearm,
+            self.refuel,
+            self.repair,
+            self.planetary,
+            self.type_id,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.system_id != other.system_id:
+            changed["system_id"] = other.system_id
+        if self.ls_from_star != other.ls_from_star:
+            changed["ls_from_star"] = other.ls_from_star
+        if self.blackmarket != other.blackmarket:
+            changed["blackmarket"] = other.blackmarket
+        if self.max_pad_size != other.max_pad_size:
+            changed["max_pad_size"] = other.max_pad_size
+        if self.market != other.market:
+            changed["market"] = other.market
+        if self.shipyard != other.shipyard:
+            changed["shipyard"] = other.shipyard
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        if self.outfitting != other.outfitting:
+            changed["outfitting"] = other.outfitting
+        if self.rearm != other.rearm:
+            changed["rearm"] = other.rearm
+        if self.refuel != other.refuel:
+            changed["refuel"] = other.refuel
+        if self.repair != other.repair:
+            changed["repair"] = other.repair
+        if self.planetary != other.planetary:
+            changed["planetary"] = other.planetary
+        if self.type_id != other.type_id:
+            changed["type_id"] = other.type_id
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class StationDemand:
     """TradeDangerous "StationDemand" table"""
     station_id: int
@@ -119,7 +397,41 @@ class StationDemand:
     modified: int
     from_live: int = 0
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.station_id,
+            self.item_id,
+            self.price,
+            self.units,
+            self.level,
+            self.modified,
+            self.from_live,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.item_id != other.item_id:
+            changed["item_id"] = other.item_id
+        if self.price != other.price:
+            changed["price"] = other.price
+        if self.units != other.units:
+            changed["units"] = other.units
+        if self.level != other.level:
+            changed["level"] = other.level
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        if self.from_live != other.from_live:
+            changed["from_live"] = other.from_live
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class StationItem:
     """TradeDangerous "StationItem" table"""
     station_id: int
@@ -133,7 +445,50 @@ class StationItem:
     modified: str = field(default_factory = CURRENT_TIMESTAMP)
     from_live: int = 0
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.station_id,
+            self.item_id,
+            self.demand_price,
+            self.demand_units,
+            self.demand_level,
+            self.supply_price,
+            self.supply_units,
+            self.supply_level,
+            self.modified,
+            self.from_live,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.item_id != other.item_id:
+            changed["item_id"] = other.item_id
+        if self.demand_price != other.demand_price:
+            changed["demand_price"] = other.demand_price
+        if self.demand_units != other.demand_units:
+            changed["demand_units"] = other.demand_units
+        if self.demand_level != other.demand_level:
+            changed["demand_level"] = other.demand_level
+        if self.supply_price != other.supply_price:
+            changed["supply_price"] = other.supply_price
+        if self.supply_units != other.supply_units:
+            changed["supply_units"] = other.supply_units
+        if self.supply_level != other.supply_level:
+            changed["supply_level"] = other.supply_level
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        if self.from_live != other.from_live:
+            changed["from_live"] = other.from_live
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class StationSupply:
     """TradeDangerous "StationSupply" table"""
     station_id: int
@@ -144,7 +499,41 @@ class StationSupply:
     modified: int
     from_live: int = 0
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.station_id,
+            self.item_id,
+            self.price,
+            self.units,
+            self.level,
+            self.modified,
+            self.from_live,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.item_id != other.item_id:
+            changed["item_id"] = other.item_id
+        if self.price != other.price:
+            changed["price"] = other.price
+        if self.units != other.units:
+            changed["units"] = other.units
+        if self.level != other.level:
+            changed["level"] = other.level
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        if self.from_live != other.from_live:
+            changed["from_live"] = other.from_live
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class System:
     """TradeDangerous "System" table"""
     system_id: int
@@ -155,7 +544,41 @@ class System:
     added_id: int = None
     modified: str = field(default_factory = CURRENT_TIMESTAMP)
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.system_id,
+            self.name,
+            self.pos_x,
+            self.pos_y,
+            self.pos_z,
+            self.added_id,
+            self.modified,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.system_id != other.system_id:
+            changed["system_id"] = other.system_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.pos_x != other.pos_x:
+            changed["pos_x"] = other.pos_x
+        if self.pos_y != other.pos_y:
+            changed["pos_y"] = other.pos_y
+        if self.pos_z != other.pos_z:
+            changed["pos_z"] = other.pos_z
+        if self.added_id != other.added_id:
+            changed["added_id"] = other.added_id
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class Upgrade:
     """TradeDangerous "Upgrade" table"""
     upgrade_id: int
@@ -164,9 +587,59 @@ class Upgrade:
     rating: str = None
     ship: str = None
 
-@dataclass(frozen=True)
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.upgrade_id,
+            self.name,
+            self.class_,
+            self.rating,
+            self.ship,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.upgrade_id != other.upgrade_id:
+            changed["upgrade_id"] = other.upgrade_id
+        if self.name != other.name:
+            changed["name"] = other.name
+        if self.class_ != other.class_:
+            changed["class"] = other.class_
+        if self.rating != other.rating:
+            changed["rating"] = other.rating
+        if self.ship != other.ship:
+            changed["ship"] = other.ship
+        return changed
+
+@dataclass(frozen=True, slots=True)
 class UpgradeVendor:
     """TradeDangerous "UpgradeVendor" table"""
     upgrade_id: int
     station_id: int
     modified: str
+
+    @classmethod
+    def from_row(cls, row: tuple) -> Self:
+        return cls(*row)
+
+    def to_row(self) -> tuple:
+        return (
+            self.upgrade_id,
+            self.station_id,
+            self.modified,
+        )
+
+    def diff(self, other: Self) -> dict[str, Any]:
+        """columns with a different value in other"""
+        changed = {}
+        if self.upgrade_id != other.upgrade_id:
+            changed["upgrade_id"] = other.upgrade_id
+        if self.station_id != other.station_id:
+            changed["station_id"] = other.station_id
+        if self.modified != other.modified:
+            changed["modified"] = other.modified
+        return changed
@@ -1,90 +1,230 @@
 import logging
 import time
 import sqlite3
+import threading
+import functools
 import os.path
+import bisect
+import hashlib
 
 from typing import Self, Any
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator, Callable, Hashable
+from contextlib import contextmanager
 from datetime import datetime
-from dataclasses import asdict, astuple
+from dataclasses import dataclass, replace
+from pathlib import Path
 
 from companion import CAPIData
 from edmc_data import companion_category_map, ship_name_map
 
 
 from .misc import (
-    snap_to_grid, update_from_dict, insert_from_dict, get_from_StationServices, make_number,
-    build_insert_stmt, get_field_names, shipyard_iterator, convert_entry_to_StationItem,
-    list_or_dict_iterator, construction_depot_iterator,
+    snap_to_grid, get_from_StationServices, make_number, shipyard_iterator,
+    list_or_dict_iterator, construction_depot_iterator, chunked,
 )
 from .const import (
+    SQLITE_MAX_VARIABLES, SYSTEM_CACHE_SIZE, STATION_CACHE_SIZE, FINGERPRINT_TABLE, DEPOT_TABLE,
+    BUSY_TIMEOUT_MS, LOCK_RETRIES, LOCK_BACKOFF_MS, LOCK_BACKOFF_MAX_MS,
     PLANETARY_STATION_TYPES, STATION_TYPE_MAP, PADSIZE_BY_STATION_TYPE,
     STRONGHOLDCARRIER_NAME, STRONGHOLDCARRIER_REGEX, COLONISATIONSHIP_NAME, COLONISATIONSHIP_REGEX
 )
 from .tables import Added, Category, Item, Ship, Upgrade, Station, System, RareItem
 from .tables import StationItem, ShipVendor, UpgradeVendor
+from .cache import LRUCache
+from .statements import get_statements, get_upsert
+from .profiler import StatementProfiler
+from .journalfiles import market_to_capi, shipyard_to_capi, outfitting_to_capi
+from .market import CommodityRef, price_columns, station_item_rows
+from .depot import DepotCommodity, DepotState, diff_depot
+from .indexes import IndexAudit, audit_indexes
+
+
+# CAPI categories without a market, like companion.py
+SKIP_CATEGORIES = frozenset(name for name, mapped_name in companion_category_map.items() if not mapped_name)
+# reference tables, fully cached
+REFERENCE_TABLES = {
+    table_class.__name__: table_class for table_class in (Added, Category, Item, RareItem, Ship, Upgrade)
+}
+
+
+def is_locked_error(err: sqlite3.Error) -> bool:
+    """SQLITE_BUSY or SQLITE_LOCKED, including the extended codes"""
+    return (getattr(err, "sqlite_errorcode", 0) & 0xff) in {sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED}
+
+def unit_of_work(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    run the method in a transaction, joining an already open one;
+    the outermost one is retried with backoff while the database is locked,
+    so the method must neither change nor use up its arguments
+    """
+    @functools.wraps(func)
+    def wrapper(self: "TradeDB", *args: Any, **kwargs: Any) -> Any:
+        if self.tx_depth:
+            return func(self, *args, **kwargs)
+        started = time.perf_counter()
+        for attempt in range(self.lock_retries + 1):
+            try:
+                with self.transaction():
+                    result = func(self, *args, **kwargs)
+            except sqlite3.OperationalError as err:
+                if not is_locked_error(err) or attempt == self.lock_retries or self.cancel_retries.is_set():
+                    if is_locked_error(err):
+                        self.lock_stats.add(attempt, time.perf_counter() - started, ok=False)
+                    raise
+                backoff_ms = min(LOCK_BACKOFF_MS * 2**attempt, LOCK_BACKOFF_MAX_MS)
+                self.logger.info(f"{func.__name__}: {err}, retry in {backoff_ms} ms")
+                if self.cancel_retries.wait(backoff_ms / 1000):
+                    self.lock_stats.add(attempt, time.perf_counter() - started, ok=False)
+                    raise
+                continue
+            if attempt:
+                self.lock_stats.add(attempt, time.perf_counter() - started, ok=True)
+            return result
+    return wrapper
+
+
+@dataclass
+class LockStats:
+    """Units of work which had to wait for a lock of another process."""
+    retried: int = 0
+    retries: int = 0
+    failed: int = 0
+    wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    def add(self: Self, retries: int, wait_s: float, ok: bool) -> None:
+        self.retried += 1
+        self.retries += retries
+        if not ok:
+            self.failed += 1
+        self.wait_ms += wait_s * 1000
+        self.max_wait_ms = max(self.max_wait_ms, wait_s * 1000)
+
+    def __str__(self: Self) -> str:
+        return (
+            f"retried: {self.retried}, retries: {self.retries}, failed: {self.failed}"
+            f", wait total/max: {self.wait_ms:.1f}/{self.max_wait_ms:.1f} ms"
+        )
+
 
 class TradeDB:
     """Database class for interaction."""
 
     timestamp: str = None
 
-    added_by_name: dict[str, Added] = {}
-    category_by_name: dict[str, Category] = {}
-    category_by_id: dict[int, Category] = {}
-    item_by_id: dict[int, Item] = {}
-    rareitem_by_id: dict[int, RareItem] = {}
-    rareitem_cache: dict[int, list[RareItem]] = {}
-    ship_by_id: dict[int, Ship] = {}
-    upgrade_by_id: dict[int, Upgrade] = {}
-    fdev_name_to_id: dict[str, int] = {}
-    construction_depot_cache: dict[int, int] = {}
-
-    system_by_id: dict[int, System] = {}
-    station_by_id: dict[int, Station] = {}
-
     def __init__(
         self: Self, logger: logging.Logger, db_filename: str, create_item: bool = True,
-        create_ship: bool = True, create_module: bool = True, use_rareitem_cache: bool = False
+        create_ship: bool = True, create_module: bool = True, use_rareitem_cache: bool = False,
+        diff_update: bool = False, system_cache_size: int = SYSTEM_CACHE_SIZE,
+        station_cache_size: int = STATION_CACHE_SIZE, profiler: StatementProfiler | None = None,
+        touch_unchanged: bool = True,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS, lock_retries: int = LOCK_RETRIES,
+        cache_size_kib: int | None = None, mmap_size: int | None = None, create_indexes: bool = False,
+        connect: bool = True
     ):
+        # reference tables stay fully resident
+        self.added_by_name: dict[str, Added] = {}
+        self.category_by_name: dict[str, Category] = {}
+        self.category_by_id: dict[int, Category] = {}
+        self.item_by_id: dict[int, Item] = {}
+        self.rareitem_by_id: dict[int, RareItem] = {}
+        self.rareitem_cache: dict[int, list[RareItem]] = {}
+        self.ship_by_id: dict[int, Ship] = {}
+        self.upgrade_by_id: dict[int, Upgrade] = {}
+        self.fdev_name_to_id: dict[str, int] = {}
+        # progress of the construction depots, read from the side table on first use
+        self.construction_depot_cache: dict[int, DepotState] = {}
+        self.commodity_refs: dict[int, CommodityRef] = {}
+        # per category (name, item_id) in ui_order and the first position to renumber
+        self.item_order: dict[int, list[tuple[str, int]]] = {}
+        self.ui_order_pending: dict[int, int] = {}
+        # systems and stations are only cached as long as they are used
+        self.system_by_id: LRUCache = LRUCache(system_cache_size)
+        self.station_by_id: LRUCache = LRUCache(station_cache_size)
+
         self.logger = logger
+        self.profiler = profiler or StatementProfiler()
         self.db_filename = db_filename
-        self.conn = None
-        self.reorder_item = False
+        self.conn: sqlite3.Connection | None = None
+        # lookups outside of a transaction, None if it could not be opened
+        self.read_conn: sqlite3.Connection | None = None
+        self.busy_timeout_ms = busy_timeout_ms
+        self.lock_retries = lock_retries
+        # page cache and memory map of the connections, None keeps the SQLite default
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.create_indexes = create_indexes
+        # the plugin tables exist, otherwise every station service is written in full
+        self.side_tables = False
+        # index audit per database file, done once
+        self.index_audits: dict[str, IndexAudit] = {}
+        self.lock_stats = LockStats()
+        # set at shutdown, a locked unit of work then fails without retry
+        self.cancel_retries = threading.Event()
+        self.tx_depth = 0
+        self.tx_failed = False
+        # cache entries and reference tables written in the open transaction, undone by rollback()
+        self.tx_touched: set[tuple[str, Hashable]] = set()
+        self.tx_tables: set[str] = set()
+        self.defer_ui_order = False
         self.create_item = create_item
         self.create_ship = create_ship
         self.create_module = create_module
         self.use_rareitem_cache = use_rareitem_cache
-        self.connect()
-        self.load()
+        self.diff_update = diff_update
+        self.touch_unchanged = touch_unchanged
+        # otherwise the owner calls connect() and load(), e.g. on the writer thread
+        if connect:
+            self.connect()
+            self.load()
 
     @property
     def is_connected(self: Self) -> bool:
         return bool(self.conn)
 
     def get_db(self: Self) -> sqlite3.Connection:
-        if self.conn:
-            return self.conn
+        if not self.conn:
+            # never open a connection behind the back of connect()
+            raise sqlite3.OperationalError("database not connected")
+        return self.conn
 
-        self.logger.info(f"Connect to DB: {self.db_filename = !r}")
-        conn = sqlite3.connect(self.db_filename)
-        conn.execute("PRAGMA foreign_keys=ON")
+    def open_connection(self: Self, read_only: bool = False) -> sqlite3.Connection:
+        # the connections are handed over to the writer thread after start
+        if read_only:
+            uri = f"{Path(self.db_filename).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_filename, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
         conn.execute("PRAGMA temp_store=MEMORY")
-        conn.execute("PRAGMA synchronous=NORMAL")
-        conn.execute("PRAGMA journal_mode=WAL")
-
-        # SQLite does only ASCII upper/lower, replace them
-        conn.create_function("upper", 1, str.upper)
-        conn.create_function("lower", 1, str.lower)
-
+        if self.cache_size_kib:
+            conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)}")
+        if self.mmap_size is not None:
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        if not read_only:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA journal_mode=WAL")
         return conn
 
     def close(self: Self) -> None:
+        if self.read_conn:
+            self.read_conn.close()
+        self.read_conn = None
         if self.conn:
             self.conn.close()
             self.logger.info("Database connection closed.")
+            for name, stats in self.cache_stats().items():
+                self.logger.info(f"{name} cache: {stats}")
+            self.logger.info(f"lock waits: {self.lock_stats}")
         self.conn = None
 
+    def cache_stats(self: Self) -> dict[str, dict[str, int]]:
+        return {
+            "System": self.system_by_id.stats,
+            "Station": self.station_by_id.stats,
+        }
+
     def connect(self: Self) -> None:
         self.close()
         if not self.db_filename:
@@ -94,30 +234,180 @@ class TradeDB:
             self.logger.error(f"{self.db_filename!r}: not a file.")
             return
 
-        self.conn = self.get_db()
+        self.logger.info(f"Connect to DB: {self.db_filename = !r}")
+        self.conn = self.open_connection()
+        self.create_side_tables()
+        self.check_indexes()
+        try:
+            self.read_conn = self.open_connection(read_only=True)
+        except sqlite3.Error as err:
+            self.logger.warning(f"no read-only connection, lookups use the writer connection: {err}")
+
+    def create_side_tables(self: Self) -> None:
+        """plugin tables, TradeDangerous ignores them"""
+        try:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {FINGERPRINT_TABLE}("
+                "station_id INTEGER NOT NULL, service TEXT NOT NULL, fingerprint BLOB NOT NULL,"
+                " modified DATETIME, PRIMARY KEY(station_id, service))"
+            )
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {DEPOT_TABLE}("
+                "station_id INTEGER NOT NULL, item_id INTEGER NOT NULL, required INTEGER NOT NULL,"
+                " provided INTEGER NOT NULL, payment INTEGER NOT NULL, complete INTEGER NOT NULL,"
+                " modified DATETIME, PRIMARY KEY(station_id, item_id))"
+            )
+            self.conn.commit()
+        except sqlite3.Error as err:
+            self.logger.warning(f"side tables not created: {err}")
+        # e.g. a read-only file may still have them
+        (count,) = self.conn.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN (?,?)",
+            (FINGERPRINT_TABLE, DEPOT_TABLE)
+        ).fetchone()
+        self.side_tables = (count == 2)
+        if not self.side_tables:
+            self.logger.warning("no side tables, unchanged payloads are written in full")
+
+    def check_indexes(self: Self) -> None:
+        """audit (and create) the station indexes, the plugin connects on the writer thread"""
+        if self.db_filename in self.index_audits:
+            return
+        try:
+            audit = audit_indexes(self.conn, self.create_indexes)
+        except sqlite3.Error as err:
+            self.logger.warning(f"index audit failed: {err}")
+            return
+        self.index_audits[self.db_filename] = audit
+        self.logger.info(f"index audit: {audit}")
+        for table in audit.created:
+            self.logger.info(f"created station index on {table}")
+        for table, stmt in zip(audit.missing, audit.recommended):
+            self.logger.warning(f"no index on {table}(station_id), every dock scans the whole table")
+            self.logger.info(f"recommended: {stmt}")
+        for stmt, details in audit.full_scans:
+            self.logger.warning(f"full scan ({'; '.join(details)}): {stmt}")
+
+    @contextmanager
+    def transaction(self: Self) -> Iterator[Self]:
+        """
+        Unit of work: everything executed inside is committed once at the end
+        of the outermost transaction or rolled back if anything failed.
+        """
+        self.tx_depth += 1
+        try:
+            yield self
+            if self.tx_depth == 1:
+                self.update_item_ui_order()
+        except BaseException:
+            self.tx_failed = True
+            raise
+        finally:
+            self.tx_depth -= 1
+            if self.tx_depth == 0:
+                failed, self.tx_failed = self.tx_failed, False
+                if failed:
+                    self.rollback()
+                elif self.is_connected:
+                    try:
+                        self.conn.commit()
+                    except sqlite3.Error:
+                        self.rollback()
+                        raise
+                    self.tx_touched.clear()
+                    self.tx_tables.clear()
+
+    @contextmanager
+    def bulk_mode(self: Self) -> Iterator[Self]:
+        """defer the ui_order maintenance until the end of a bulk import"""
+        self.defer_ui_order = True
+        try:
+            yield self
+        finally:
+            self.defer_ui_order = False
+        # renumber everything, a rollback in between reloaded the items from the database
+        self.reindex_ui_order()
+        self.update_item_ui_order()
+
+    def rollback(self: Self) -> None:
+        """roll back the transaction and drop the cached rows which never made it into the database"""
+        touched, self.tx_touched = self.tx_touched, set()
+        tables, self.tx_tables = self.tx_tables, set()
+        if not self.is_connected:
+            return
+        self.conn.rollback()
+        for cache_name, key in touched:
+            getattr(self, cache_name).pop(key, None)
+        for table_name in sorted(tables):
+            self.reload_table(table_name)
+        if "Item" in tables:
+            self.reindex_ui_order()
+        self.logger.warning(
+            f"transaction rolled back, {len(touched)} cached entries dropped"
+            f", reloaded: {', '.join(sorted(tables)) or '-'}"
+        )
+
+    def touch(self: Self, cache_name: str, key: Hashable) -> None:
+        """remember a cache entry written in the transaction"""
+        if self.tx_depth:
+            self.tx_touched.add((cache_name, key))
+
+    def touch_table(self: Self, table_name: str) -> None:
+        """remember a reference table written in the transaction"""
+        if self.tx_depth:
+            self.tx_tables.add(table_name)
 
     def execute(self: Self, stmt: str, bind: Iterable|None=None, many=False) -> sqlite3.Cursor:
-        conn = self.get_db()
+        # outside of a transaction a SELECT sees nothing uncommitted, use the read-only connection
+        if not self.tx_depth and self.read_conn and not many and stmt.lstrip()[:6].upper() == "SELECT":
+            conn = self.read_conn
+        else:
+            conn = self.get_db()
         curs = conn.cursor()
         time_ms = time.perf_counter()*-1000
         if many:
             ret = curs.executemany(stmt, bind)
         else:
             ret = curs.execute(stmt, bind or ())
-        conn.commit()
+        if not self.tx_depth and conn is self.conn:
+            conn.commit()
         time_ms += time.perf_counter()*1000
-        self.logger.debug(f"{time_ms}: {stmt} ({bind})")
+        self.profiler.record(stmt, time_ms, ret.rowcount)
+        if self.profiler.is_slow(time_ms):
+            self.log_slow_query(stmt, time_ms, bind, many)
+        elif self.logger.isEnabledFor(logging.DEBUG):
+            # executemany has used up an iterator bind, log the row count instead
+            if many:
+                self.logger.debug("%.3f ms: %s (%d rows)", time_ms, stmt, ret.rowcount)
+            else:
+                self.logger.debug("%.3f ms: %s (%r)", time_ms, stmt, bind)
         return ret
 
+    def log_slow_query(self: Self, stmt: str, time_ms: float, bind: Iterable|None, many: bool) -> None:
+        plan = None
+        if self.profiler.explain and not many:
+            try:
+                plan = tuple(
+                    row[-1] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {stmt}", bind or ())
+                )
+            except sqlite3.Error as err:
+                self.logger.debug(f"no query plan: {err}")
+        slow_query = self.profiler.record_slow(stmt, time_ms, None if many else bind, plan)
+        self.logger.info(
+            "slow statement %.3f ms: %s (%s) %s", time_ms, slow_query.stmt, slow_query.bind, plan or ""
+        )
+
     def change_settings(
         self: Self, db_filename: str, create_item: bool = True,
         create_ship: bool = True, create_module: bool = True,
-        use_rareitem_cache: bool = False
+        use_rareitem_cache: bool = False, diff_update: bool = False, touch_unchanged: bool = True
     ) -> None:
         self.create_item = create_item
         self.create_ship = create_ship
         self.create_module = create_module
         self.use_rareitem_cache = use_rareitem_cache
+        self.diff_update = diff_update
+        self.touch_unchanged = touch_unchanged
         if db_filename != self.db_filename:
             self.db_filename = db_filename
             self.logger.info(f"new DB filename: {self.db_filename = !r}")
@@ -125,70 +415,77 @@ class TradeDB:
             self.load()
 
     def load(self: Self) -> None:
+        """fill the reference caches"""
         if not self.is_connected:
             return
 
-        self._load_Added()
-        self._load_Category()
-        self._load_Item()
-        self._load_RareItem()
-        self._load_Ship()
-        self._load_Upgrade()
+        for table_name, table_class in REFERENCE_TABLES.items():
+            getattr(self, f"_load_{table_name}")(self.execute(get_statements(table_class).select))
+        self.build_commodity_refs()
+
+    def reload_table(self: Self, table_name: str) -> None:
+        """reload the cache of one reference table"""
+        self.touch_table(table_name)
+        select = get_statements(REFERENCE_TABLES[table_name]).select
+        getattr(self, f"_load_{table_name}")(self.execute(select))
+        self.build_commodity_refs()
 
-    def _load_Added(self: Self) -> None:
+    def _load_Added(self: Self, rows: Iterable[tuple]) -> None:
         self.added_by_name.clear()
-        columns = ",".join(get_field_names(Added))
-        for row in self.execute(f"SELECT {columns} FROM Added"):
-            added = Added(*row)
+        for row in rows:
+            added = Added.from_row(row)
             self.added_by_name[added.name.upper()] = added
-        self.logger.debug(f"Added: {self.added_by_name}")
+        self.logger.debug(f"Added: {len(self.added_by_name)} rows")
 
-    def _load_Category(self: Self) -> None:
+    def _load_Category(self: Self, rows: Iterable[tuple]) -> None:
         self.category_by_name.clear()
-        columns = ",".join(get_field_names(Category))
-        for row in self.execute(f"SELECT {columns} FROM Category"):
-            category = Category(*row)
+        self.category_by_id.clear()
+        for row in rows:
+            category = Category.from_row(row)
             self.category_by_name[category.name.upper()] = category
             self.category_by_id[category.category_id] = category
-        self.logger.debug(f"Category: {self.category_by_name}")
+        self.logger.debug(f"Category: {len(self.category_by_id)} rows")
 
-    def _load_Item(self: Self) -> None:
+    def _load_Item(self: Self, rows: Iterable[tuple]) -> None:
+        # items and their order are rebuilt; ui_order_pending is not cleared,
+        # committed items may still wait for their renumbering
         self.item_by_id.clear()
-        columns = ",".join(get_field_names(Item))
-        for row in self.execute(f"SELECT {columns} FROM Item"):
-            item = Item(*row)
+        self.item_order.clear()
+        for row in rows:
+            item = Item.from_row(row)
             self.item_by_id[item.item_id] = item
-        self.logger.debug(f"Item: {self.item_by_id}")
+            self.item_order.setdefault(item.category_id, []).append((item.name.upper(), item.item_id))
+        for order in self.item_order.values():
+            order.sort()
+        self.logger.debug(f"Item: {len(self.item_by_id)} rows")
 
-    def _load_RareItem(self: Self) -> None:
+    def _load_RareItem(self: Self, rows: Iterable[tuple]) -> None:
         self.rareitem_by_id.clear()
         self.rareitem_cache.clear()
-        columns = ",".join(get_field_names(RareItem))
-        for row in self.execute(f"SELECT {columns} FROM RareItem"):
-            rareitem = RareItem(*row)
+        for row in rows:
+            rareitem = RareItem.from_row(row)
             self.rareitem_by_id[rareitem.rare_id] = rareitem
-        self.logger.debug(f"RareItem: {self.rareitem_by_id}")
+        self.logger.debug(f"RareItem: {len(self.rareitem_by_id)} rows")
 
-    def _load_Ship(self: Self) -> None:
+    def _load_Ship(self: Self, rows: Iterable[tuple]) -> None:
         self.ship_by_id.clear()
-        columns = ",".join(get_field_names(Ship))
-        for row in self.execute(f"SELECT {columns} FROM Ship"):
-            ship = Ship(*row)
+        for row in rows:
+            ship = Ship.from_row(row)
             self.ship_by_id[ship.ship_id] = ship
-        self.logger.debug(f"Ship: {self.ship_by_id}")
+        self.logger.debug(f"Ship: {len(self.ship_by_id)} rows")
 
-    def _load_Upgrade(self: Self) -> None:
+    def _load_Upgrade(self: Self, rows: Iterable[tuple]) -> None:
         self.upgrade_by_id.clear()
-        columns = ",".join(get_field_names(Upgrade))
-        for row in self.execute(f"SELECT {columns} FROM Upgrade"):
-            upgrade = Upgrade(*row)
+        for row in rows:
+            upgrade = Upgrade.from_row(row)
             self.upgrade_by_id[upgrade.upgrade_id] = upgrade
-        self.logger.debug(f"Upgrade: {self.upgrade_by_id}")
+        self.logger.debug(f"Upgrade: {len(self.upgrade_by_id)} rows")
 
     def get_Added(self: Self, name: str) -> Added:
         if not (added := self.added_by_name.get(name.upper())):
             added = Added(self.execute("INSERT INTO Added(name) VALUES(?)", (name,)).lastrowid, name)
             self.added_by_name[added.name.upper()] = added
+            self.touch_table("Added")
             self.logger.info(f"created {added = }")
         return added
 
@@ -199,8 +496,8 @@ class TradeDB:
             category = Category(self.execute("INSERT INTO Category(name) VALUES(?)", (name,)).lastrowid, name)
             self.category_by_name[category.name.upper()] = category
             self.category_by_id[category.category_id] = category
+            self.touch_table("Category")
             self.logger.info(f"created {category = }")
-            self.reorder_item = True
         return category
 
     def get_Item(self: Self, item_id: int) -> Item | None:
@@ -217,19 +514,38 @@ class TradeDB:
 
     def get_System(self: Self, address: int) -> System | None:
         if not (system := self.system_by_id.get(address)):
-            columns = ",".join(get_field_names(System))
-            if row := self.execute(f"SELECT {columns} FROM System WHERE system_id = ?", (address,)).fetchone():
-                system = System(*row)
+            if row := self.execute(get_statements(System).select_by_key, (address,)).fetchone():
+                system = System.from_row(row)
                 self.system_by_id[address] = system
+                self.touch("system_by_id", address)
         self.logger.debug(f"get_System({address = }) -> {system = }")
         return system
 
+    def get_Systems(self: Self, addresses: Iterable[int]) -> dict[int, System]:
+        """lookup many systems, cache misses are read with chunked IN (...) queries"""
+        systems, missing = {}, set()
+        for address in addresses:
+            if system := self.system_by_id.get(address):
+                systems[address] = system
+            else:
+                missing.add(address)
+        select = get_statements(System).select
+        for chunk in chunked(missing, SQLITE_MAX_VARIABLES):
+            stmt = f"{select} WHERE system_id IN ({','.join('?'*len(chunk))})"
+            for row in self.execute(stmt, chunk):
+                system = System.from_row(row)
+                self.system_by_id[system.system_id] = system
+                self.touch("system_by_id", system.system_id)
+                systems[system.system_id] = system
+        self.logger.debug(f"get_Systems(): {len(systems)} found, {len(missing)} read")
+        return systems
+
     def get_Station(self: Self, market_id: int) -> Station | None:
         if not (station := self.station_by_id.get(market_id)):
-            columns = ",".join(get_field_names(Station))
-            if row := self.execute(f"SELECT {columns} FROM Station WHERE station_id = ?", (market_id,)).fetchone():
-                station = Station(*row)
+            if row := self.execute(get_statements(Station).select_by_key, (market_id,)).fetchone():
+                station = Station.from_row(row)
                 self.station_by_id[market_id] = station
+                self.touch("station_by_id", market_id)
         self.logger.debug(f"get_Station({market_id = }) -> {station = }")
         return station
 
@@ -245,11 +561,12 @@ class TradeDB:
                 avg_price = make_number(entry["meanPrice"]),
                 fdev_id = entry["id"],
             )
-            stmt, bind = insert_from_dict("Item", asdict(item))
-            self.execute(stmt, bind)
+            stmts = get_statements(Item)
+            self.execute(stmts.insert, stmts.to_row(item))
             self.item_by_id[item.item_id] = item
+            self.touch_table("Item")
             self.logger.info(f"created {item = }")
-            self.reorder_item = True
+            self.index_item(item)
         return item
 
     def make_Upgrade(self: Self, entry: dict) -> Upgrade | None:
@@ -260,9 +577,10 @@ class TradeDB:
                 class_ = "?",
                 rating = "?",
             )
-            stmt, bind = insert_from_dict("Upgrade", asdict(upgrade))
-            self.execute(stmt, bind)
+            stmts = get_statements(Upgrade)
+            self.execute(stmts.insert, stmts.to_row(upgrade))
             self.upgrade_by_id[upgrade.upgrade_id] = upgrade
+            self.touch_table("Upgrade")
             self.logger.info(f"created {upgrade = }")
         return upgrade
 
@@ -273,9 +591,10 @@ class TradeDB:
                 name = ship_name_map.get(entry["name"].lower(), entry["name"]),
                 cost = make_number(entry["basevalue"]),
             )
-            stmt, bind = insert_from_dict("Ship", asdict(ship))
-            self.execute(stmt, bind)
+            stmts = get_statements(Ship)
+            self.execute(stmts.insert, stmts.to_row(ship))
             self.ship_by_id[ship.ship_id] = ship
+            self.touch_table("Ship")
             self.logger.info(f"created {ship = }")
         return ship
 
@@ -283,56 +602,106 @@ class TradeDB:
         if not self.use_rareitem_cache:
             return
 
-        for rareitem in self.rareitem_cache.pop(station_id, []):
+        # kept in the cache, a rolled back insert is done again on the next dock
+        for rareitem in self.rareitem_cache.get(station_id, []):
             if rareitem.rare_id in self.rareitem_by_id:
                 continue
-            stmt, bind = insert_from_dict("RareItem", asdict(rareitem))
-            self.execute(stmt, bind)
+            stmts = get_statements(RareItem)
+            self.execute(stmts.insert, stmts.to_row(rareitem))
             self.rareitem_by_id[rareitem.rare_id] = rareitem
+            self.commodity_refs[rareitem.rare_id] = CommodityRef(None, rareitem.category_id, True)
+            self.touch("rareitem_by_id", rareitem.rare_id)
+            self.touch("commodity_refs", rareitem.rare_id)
             self.logger.info(f"created {rareitem = }")
 
+    def build_commodity_refs(self: Self) -> None:
+        """precomputed commodity id -> (item, category, is_rare) resolution table"""
+        self.commodity_refs = {
+            item.item_id: CommodityRef(item.item_id, item.category_id, False)
+            for item in self.item_by_id.values()
+        }
+        for rareitem in self.rareitem_by_id.values():
+            self.commodity_refs[rareitem.rare_id] = CommodityRef(None, rareitem.category_id, True)
+
+    def resolve_commodity(self: Self, entry: dict) -> CommodityRef | None:
+        """the item of a market entry, unknown ids take the make_Item path once"""
+        if not (category_name := entry.get("categoryname")) or category_name in SKIP_CATEGORIES:
+            return None
+        if not (ref := self.commodity_refs.get(entry["id"])):
+            if not (item := self.make_Item(entry)):
+                self.logger.warning(f"unknown item: {entry['id']} - {entry['name']}")
+                return None
+            ref = self.commodity_refs[item.item_id] = CommodityRef(item.item_id, item.category_id, False)
+        if ref.is_rare:
+            self.logger.debug(f"ignore rareitem: {entry['id']} - {entry['name']}")
+            return None
+        return ref
+
+    def index_item(self: Self, item: Item) -> None:
+        """
+        Keep the per category name order of a new item, only its category
+        is renumbered from the new position on.
+        """
+        order = self.item_order.setdefault(item.category_id, [])
+        key = (item.name.upper(), item.item_id)
+        pos = bisect.bisect_left(order, key)
+        if pos == len(order) or order[pos] != key:
+            order.insert(pos, key)
+        self._mark_ui_order(item.category_id, pos)
+
+    def reindex_ui_order(self: Self) -> None:
+        """renumber all categories at the end of the unit of work"""
+        for category_id in self.item_order:
+            self._mark_ui_order(category_id, 0)
+
+    def _mark_ui_order(self: Self, category_id: int, pos: int) -> None:
+        self.ui_order_pending[category_id] = min(pos, self.ui_order_pending.get(category_id, pos))
+
     def update_item_ui_order(self: Self) -> None:
-        if not (self.reorder_item and self.create_item):
+        """write the pending ui_order changes, called at the end of the unit of work"""
+        if self.defer_ui_order or not (self.ui_order_pending and self.create_item):
             return
 
-        for category in {self.category_by_id[item.category_id] for item in self.item_by_id.values()}:
-            for i, item in enumerate(sorted(
-                (item for item in self.item_by_id.values() if item.category_id == category.category_id),
-                key = lambda x: x.name.upper()
-            ), start = 1):
-                if item.ui_order == i:
+        upd_rows = []
+        for category_id, start in self.ui_order_pending.items():
+            order = self.item_order.get(category_id, [])
+            for ui_order, (_, item_id) in enumerate(order[start:], start = start + 1):
+                item = self.item_by_id[item_id]
+                if item.ui_order == ui_order:
                     continue
-                self.execute("UPDATE Item SET ui_order=? WHERE item_id=?", (i, item.item_id))
-
-        self.reorder_item = False
+                upd_rows.append((ui_order, item_id))
+                self.item_by_id[item_id] = replace(item, ui_order=ui_order)
+        self.ui_order_pending.clear()
+        if upd_rows:
+            self.touch_table("Item")
+            self.execute("UPDATE Item SET ui_order=? WHERE item_id=?", upd_rows, many=True)
+            self.logger.info(f"ui_order updated for {len(upd_rows)} items")
 
-    def update_entry(self: Self, tbl_name: str, old_entry: Any, new_entry: Any, **id_columns) -> None:
+    def update_entry(self: Self, old_entry: System | Station | None, new_entry: System | Station) -> None:
+        """write a System or Station in one upsert and cache the written entry"""
+        tbl_class = type(new_entry)
         if old_entry == new_entry:
             info_text = "up-to-date"
         else:
+            stmts = get_statements(tbl_class)
             if old_entry is None:
                 info_text = "created"
-                stmt, bind = insert_from_dict(tbl_name, asdict(new_entry))
+                upd_columns = frozenset(stmts.value_columns)
             else:
                 info_text = "updated"
-                upd_columns = {}
-                for col_name, old_value in asdict(old_entry).items():
-                    new_value = getattr(new_entry, col_name)
-                    if new_value != old_value:
-                        upd_columns[col_name] = new_value
-                upd_columns["modified"] = self.timestamp
-                stmt, bind = update_from_dict(tbl_name, upd_columns, **id_columns)
-            self.execute(stmt, bind)
-            if tbl_name == "System":
-                self.system_by_id[new_entry.system_id] = self.get_System(new_entry.system_id)
-            elif tbl_name == "Station":
-                self.station_by_id[new_entry.station_id] = self.get_Station(new_entry.station_id)
-        self.logger.info(f"{info_text} {tbl_name} {new_entry.name!r}")
+                new_entry = replace(new_entry, modified=self.timestamp)
+                upd_columns = frozenset(old_entry.diff(new_entry))
+            self.execute(get_upsert(tbl_class, upd_columns), new_entry.to_row())
+            if tbl_class is System:
+                self.system_by_id[new_entry.system_id] = new_entry
+                self.touch("system_by_id", new_entry.system_id)
+            else:
+                self.station_by_id[new_entry.station_id] = new_entry
+                self.touch("station_by_id", new_entry.station_id)
+        self.logger.info(f"{info_text} {tbl_class.__name__} {new_entry.name!r}")
 
-    def update_system(self: Self, entry: dict, cmdrname: str) -> None:
-        self.timestamp = datetime.fromisoformat(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
-        old_system = self.get_System(entry["SystemAddress"])
-        new_system = System(
+    def make_System(self: Self, entry: dict, old_system: System | None, cmdrname: str) -> System:
+        return System(
             system_id = entry["SystemAddress"],
             name = entry.get("StarSystem", entry.get("SystemName", entry.get("System"))),
             pos_x = snap_to_grid(entry["StarPos"][0]),
@@ -341,8 +710,46 @@ class TradeDB:
             added_id = old_system.added_id if old_system else self.get_Added(cmdrname).added_id,
             modified = old_system.modified if old_system else self.timestamp,
         )
-        self.update_entry("System", old_system, new_system, system_id=new_system.system_id)
 
+    @unit_of_work
+    def update_system(self: Self, entry: dict, cmdrname: str) -> None:
+        self.timestamp = datetime.fromisoformat(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        old_system = self.get_System(entry["SystemAddress"])
+        new_system = self.make_System(entry, old_system, cmdrname)
+        self.update_entry(old_system, new_system)
+
+    @unit_of_work
+    def update_systems(self: Self, entries: list[dict], cmdrname: str) -> None:
+        """bulk version of update_system, e.g. for the NavRoute"""
+        systems = self.get_Systems(entry["SystemAddress"] for entry in entries)
+        ins_systems, upd_systems = {}, {}
+        for entry in entries:
+            self.timestamp = datetime.fromisoformat(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+            old_system = systems.get(entry["SystemAddress"])
+            new_system = self.make_System(entry, old_system, cmdrname)
+            if new_system == old_system:
+                continue
+            if old_system is None or new_system.system_id in ins_systems:
+                ins_systems[new_system.system_id] = new_system
+            else:
+                new_system = replace(new_system, modified=self.timestamp)
+                upd_systems[new_system.system_id] = new_system
+            systems[new_system.system_id] = new_system
+
+        stmts = get_statements(System)
+        if ins_systems:
+            self.execute(stmts.insert, map(stmts.to_row, ins_systems.values()), many=True)
+        if upd_systems:
+            self.execute(stmts.update_by_key, map(stmts.to_update_row, upd_systems.values()), many=True)
+        for system in (*ins_systems.values(), *upd_systems.values()):
+            self.system_by_id[system.system_id] = system
+            self.touch("system_by_id", system.system_id)
+        self.logger.info(
+            f"systems: created {len(ins_systems)}, updated {len(upd_systems)}"
+            f", up-to-date {len(entries) - len(ins_systems) - len(upd_systems)}"
+        )
+
+    @unit_of_work
     def update_station(self, entry: dict) -> None:
         if not (system := self.get_System(entry["SystemAddress"])):
             self.logger.info(f"update_station(): System {entry['SystemAddress']} not found")
@@ -390,11 +797,15 @@ class TradeDB:
             planetary = "Y" if stn_type.upper() in PLANETARY_STATION_TYPES else "N",
             type_id = STATION_TYPE_MAP.get(stn_type.upper(), 0),
         )
-        self.update_entry("Station", old_station, new_station, station_id=new_station.station_id)
+        self.update_entry(old_station, new_station)
         self.check_for_rareitems(new_station.station_id)
 
     def delete_station(self, market_id: int) -> bool:
         _ = self.station_by_id.pop(market_id, None)
+        _ = self.construction_depot_cache.pop(market_id, None)
+        if self.side_tables:
+            for side_table in (FINGERPRINT_TABLE, DEPOT_TABLE):
+                self.execute(f"DELETE FROM {side_table} WHERE station_id = ?", (market_id,))
         curs = self.execute(f"DELETE FROM Station WHERE station_id = ?", (market_id,))
         return (curs.rowcount > 0)
 
@@ -416,14 +827,36 @@ class TradeDB:
             self: Self, services_name: str, station: Station, entry_dict: dict[int, tuple],
             tbl_class: StationItem | ShipVendor | UpgradeVendor, id_col_name: str,
     ):
-        tbl_name = tbl_class.__name__
+        fingerprint = self.services_fingerprint(tbl_class, entry_dict)
+        if self.check_fingerprint(services_name, station, tbl_class, fingerprint):
+            # in diff mode unchanged rows always keep their timestamp
+            if self.touch_unchanged and not self.diff_update:
+                self.execute(
+                    f"UPDATE {tbl_class.__name__} SET modified = ? WHERE station_id = ? AND modified < ?",
+                    (self.timestamp, station.station_id, self.timestamp)
+                )
+                self.save_fingerprint(services_name, station, tbl_class, fingerprint)
+                self.logger.info(f"{services_name} unchanged, timestamps refreshed")
+            else:
+                self.logger.info(f"{services_name} unchanged, skipped")
+            return
+        if self.diff_update:
+            self.diff_station_services(services_name, station, entry_dict, tbl_class, id_col_name)
+        else:
+            self.replace_station_services(services_name, station, entry_dict, tbl_class, id_col_name)
+        self.save_fingerprint(services_name, station, tbl_class, fingerprint)
+
+    def replace_station_services(
+            self: Self, services_name: str, station: Station, entry_dict: dict[int, tuple],
+            tbl_class: StationItem | ShipVendor | UpgradeVendor, id_col_name: str,
+    ):
+        stmts = get_statements(tbl_class)
         ins_count, upd_count, del_count = self.get_id_counts(
-            entry_dict.keys(), tbl_name, id_col_name, station_id=station.station_id
+            entry_dict.keys(), stmts.table, id_col_name, station_id=station.station_id
         )
-        self.execute(f"DELETE FROM {tbl_name} WHERE station_id = ?", (station.station_id,))
+        self.execute(stmts.delete_by_station, (station.station_id,))
         if entry_dict:
-            stmt = build_insert_stmt(tbl_name, get_field_names(tbl_class))
-            self.execute(stmt, entry_dict.values(), many=True)
+            self.execute(stmts.insert, entry_dict.values(), many=True)
         updated_text = ", ".join(
             f"{text}: {count}"
             for text, count in (("ins", ins_count), ("upd", upd_count), ("del", del_count))
@@ -431,6 +864,104 @@ class TradeDB:
         )
         self.logger.info(f"{services_name} updated ({updated_text or 'no change'})")
 
+    @staticmethod
+    def services_fingerprint(
+        tbl_class: StationItem | ShipVendor | UpgradeVendor, entry_dict: dict[int, tuple]
+    ) -> bytes:
+        """stable hash over the rows without the modified column"""
+        modified_index = get_statements(tbl_class).index("modified")
+        digest = hashlib.blake2b(digest_size=16)
+        for key in sorted(entry_dict):
+            row = entry_dict[key]
+            digest.update(repr(row[:modified_index] + row[modified_index+1:]).encode())
+        return digest.digest()
+
+    def check_fingerprint(
+            self: Self, services_name: str, station: Station,
+            tbl_class: StationItem | ShipVendor | UpgradeVendor, fingerprint: bytes,
+    ) -> bool:
+        """same payload as last time and the rows are still the ones written then"""
+        if not self.side_tables:
+            return False
+        row = self.execute(
+            f"SELECT fingerprint, modified FROM {FINGERPRINT_TABLE} WHERE station_id = ? AND service = ?",
+            (station.station_id, services_name)
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return False
+        (modified,) = self.execute(
+            f"SELECT max(modified) FROM {tbl_class.__name__} WHERE station_id = ?", (station.station_id,)
+        ).fetchone()
+        return modified == row[1]
+
+    def save_fingerprint(
+            self: Self, services_name: str, station: Station,
+            tbl_class: StationItem | ShipVendor | UpgradeVendor, fingerprint: bytes,
+    ) -> None:
+        if not self.side_tables:
+            return
+        (modified,) = self.execute(
+            f"SELECT max(modified) FROM {tbl_class.__name__} WHERE station_id = ?", (station.station_id,)
+        ).fetchone()
+        self.execute(
+            f"INSERT INTO {FINGERPRINT_TABLE}(station_id, service, fingerprint, modified) VALUES(?,?,?,?)"
+            " ON CONFLICT(station_id, service) DO UPDATE"
+            " SET fingerprint = excluded.fingerprint, modified = excluded.modified",
+            (station.station_id, services_name, fingerprint, modified)
+        )
+
+    def get_station_rows(
+            self: Self, station: Station, tbl_class: StationItem | ShipVendor | UpgradeVendor,
+            id_col_name: str,
+    ) -> dict[int, tuple]:
+        stmts = get_statements(tbl_class)
+        id_index = stmts.index(id_col_name)
+        return {row[id_index]: row for row in self.execute(stmts.select_by_station, (station.station_id,))}
+
+    def diff_station_services(
+            self: Self, services_name: str, station: Station, entry_dict: dict[int, tuple],
+            tbl_class: StationItem | ShipVendor | UpgradeVendor, id_col_name: str,
+    ):
+        """
+        Write only the rows which differ from the database.
+        The "modified" column is not compared, so unchanged rows keep their timestamp.
+        """
+        stmts = get_statements(tbl_class)
+        key_index = [stmts.index(col) for col in stmts.key_columns]
+        update_index = [stmts.index(col) for col in stmts.value_columns] + key_index
+        compare_index = [stmts.index(col) for col in stmts.value_columns if col != "modified"]
+
+        old_rows = self.get_station_rows(station, tbl_class, id_col_name)
+        ins_rows, upd_rows = [], []
+        for item_id, new_row in entry_dict.items():
+            if (old_row := old_rows.get(item_id)) is None:
+                ins_rows.append(new_row)
+            elif any(new_row[i] != old_row[i] for i in compare_index):
+                upd_rows.append(tuple(new_row[i] for i in update_index))
+        del_rows = [
+            tuple(old_rows[item_id][i] for i in key_index)
+            for item_id in old_rows.keys() - entry_dict.keys()
+        ]
+
+        if del_rows:
+            self.execute(stmts.delete_by_key, del_rows, many=True)
+        if upd_rows:
+            self.execute(stmts.update_by_key, upd_rows, many=True)
+        if ins_rows:
+            self.execute(stmts.insert, ins_rows, many=True)
+
+        written = len(ins_rows) + len(upd_rows) + len(del_rows)
+        skipped = len(entry_dict) - len(ins_rows) - len(upd_rows)
+        updated_text = ", ".join(
+            f"{text}: {count}"
+            for text, count in (("ins", len(ins_rows)), ("upd", len(upd_rows)), ("del", len(del_rows)))
+            if count > 0
+        )
+        self.logger.info(
+            f"{services_name} updated ({updated_text or 'no change'}; written: {written}, skipped: {skipped})"
+        )
+
+    @unit_of_work
     def update_market(self, data: dict) -> None:
         if "commodities" not in data:
             self.logger.info("no market data")
@@ -441,23 +972,31 @@ class TradeDB:
         self.check_for_rareitems(station.station_id)
 
         self.timestamp = datetime.fromisoformat(data["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
-        self.reorder_item = False
-        item_dict = {}
+        item_ids, entries = [], []
         for entry in data["commodities"]:
-            check_name = entry.get("categoryname")
-            if not companion_category_map.get(check_name, check_name):
-                continue
-            if self.get_RareItem(entry["id"]) is not None:
-                self.logger.debug(f"ignore rareitem: {entry['id']} - {entry['name']}")
-                continue
-            if not (item := self.make_Item(entry)):
-                self.logger.warning(f"unknown item: {entry['id']} - {entry['name']}")
-                continue
-            if stn_item := convert_entry_to_StationItem(station, item, self.timestamp, entry):
-                item_dict[stn_item.item_id] = astuple(stn_item)
+            if ref := self.resolve_commodity(entry):
+                item_ids.append(ref.item_id)
+                entries.append(entry)
+        rows = station_item_rows(station.station_id, self.timestamp, item_ids, price_columns(entries))
+        item_dict = {row[1]: row for row in rows}
         self.update_station_services("market", station, item_dict, StationItem, "item_id")
-        self.update_item_ui_order()
 
+    def update_journal_market(self, entry: dict) -> None:
+        self.update_market(market_to_capi(entry, self.fdev_name_to_id))
+
+    def update_journal_shipyard(self, entry: dict) -> None:
+        self.update_shipyard(shipyard_to_capi(entry, self.fdev_name_to_id))
+
+    def update_journal_outfitting(self, entry: dict) -> None:
+        self.update_outfitting(outfitting_to_capi(entry, self.fdev_name_to_id))
+
+    @unit_of_work
+    def update_starport(self, data: CAPIData) -> None:
+        self.update_market(data)
+        self.update_shipyard(data)
+        self.update_outfitting(data)
+
+    @unit_of_work
     def update_shipyard(self, data: CAPIData) -> None:
         if "ships" not in data:
             self.logger.info("no shipyard data")
@@ -467,18 +1006,20 @@ class TradeDB:
             return
 
         self.timestamp = datetime.fromisoformat(data["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        to_row = get_statements(ShipVendor).to_row
         ship_dict = {}
         for entry in shipyard_iterator(data["ships"]):
             if not (ship := self.make_Ship(entry)):
                 self.logger.warning(f"unknown ship: {entry['id']} - {entry['name']}")
                 continue
-            ship_dict[ship.ship_id] = astuple(ShipVendor(
+            ship_dict[ship.ship_id] = to_row(ShipVendor(
                 ship_id = ship.ship_id,
                 station_id = station.station_id,
                 modified = self.timestamp,
             ))
         self.update_station_services("shipyard", station, ship_dict, ShipVendor, "ship_id")
 
+    @unit_of_work
     def update_outfitting(self, data: CAPIData) -> None:
         if "modules" not in data:
             self.logger.info("no outfitting data")
@@ -488,18 +1029,20 @@ class TradeDB:
             return
 
         self.timestamp = datetime.fromisoformat(data["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+        to_row = get_statements(UpgradeVendor).to_row
         module_dict = {}
         for entry in list_or_dict_iterator(data["modules"]):
             if not (module := self.make_Upgrade(entry)):
                 self.logger.warning(f"unknown module: {entry['id']} - {entry['name']}")
                 continue
-            module_dict[module.upgrade_id] = astuple(UpgradeVendor(
+            module_dict[module.upgrade_id] = to_row(UpgradeVendor(
                 upgrade_id = module.upgrade_id,
                 station_id = station.station_id,
                 modified = self.timestamp,
             ))
         self.update_station_services("outfitting", station, module_dict, UpgradeVendor, "upgrade_id")
 
+    @unit_of_work
     def update_construction_depot(self, data: dict) -> None:
         # convert required construction items to market demand
         if not any(key in data for key in {"requiredConstructionResources", "ResourcesRequired"}):
@@ -516,19 +1059,105 @@ class TradeDB:
             return
 
         self.timestamp = datetime.fromisoformat(data["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
-        item_dict = {}
-        new_provided_sum = 0
-        old_provided_sum = self.construction_depot_cache.get(market_id, -1)
+        commodities = {}
         for fdev_name, entry in construction_depot_iterator(data):
-            new_provided_sum += entry["provided"]
-            if entry.get("complete", False):
-                continue
             if not (item := self.get_Item(self.fdev_name_to_id.get(fdev_name.upper(), 0))):
                 continue
-            item_dict[item.item_id] = astuple(StationItem(
-                station.station_id, item.item_id, entry["creditsPerUnit"],
-                entry["required"] - entry["provided"], 3, 0, 0, 0, self.timestamp, 0
-            ))
-        if new_provided_sum != old_provided_sum:
+            commodities[item.item_id] = DepotCommodity(
+                entry["required"], entry["provided"], entry["creditsPerUnit"], entry.get("complete", False)
+            )
+
+        item_dict = {
+            item_id: self.depot_row(station, item_id, commodity)
+            for item_id, commodity in commodities.items()
+            if not commodity.complete
+        }
+        if (old_state := self.get_depot_state(station)) is None:
             self.update_station_services("depot", station, item_dict, StationItem, "item_id")
-            self.construction_depot_cache[market_id] = new_provided_sum
+            self.save_depot_state(station, commodities, commodities, set(), full=True)
+            return
+        if self.timestamp < old_state.timestamp:
+            self.logger.info(f"depot data older than {old_state.timestamp}, market id: {market_id}")
+            return
+        changed, removed = diff_depot(old_state.commodities, commodities)
+        if not (changed or removed):
+            # e.g. the journal event and the CAPI data of the same visit
+            self.logger.info(f"depot unchanged, market id: {market_id}")
+            return
+
+        stmts = get_statements(StationItem)
+        upd_rows = [item_dict[item_id] for item_id in changed.keys() & item_dict.keys()]
+        del_rows = [(station.station_id, item_id) for item_id in (removed | changed.keys()) - item_dict.keys()]
+        if del_rows:
+            self.execute(stmts.delete_by_key, del_rows, many=True)
+        if upd_rows:
+            self.execute(stmts.upsert, upd_rows, many=True)
+        # the rows now match item_dict, get_depot_state() checks them against max(modified)
+        self.save_fingerprint("depot", station, StationItem, self.services_fingerprint(StationItem, item_dict))
+        self.save_depot_state(station, commodities, changed, removed)
+        self.logger.info(f"depot updated (upd: {len(upd_rows)}, del: {len(del_rows)})")
+
+    def depot_row(self: Self, station: Station, item_id: int, commodity: DepotCommodity) -> tuple:
+        # required construction items as market demand
+        return StationItem(
+            station.station_id, item_id, commodity.payment,
+            commodity.required - commodity.provided, 3, 0, 0, 0, self.timestamp, 0
+        ).to_row()
+
+    def get_depot_state(self: Self, station: Station) -> DepotState | None:
+        """
+        last written progress, None if the StationItem rows of the depot were
+        changed since, e.g. by a TradeDangerous import; always None without
+        the side tables, the depot is then written in full
+        """
+        if not self.side_tables:
+            return None
+        station_id = station.station_id
+        if (state := self.construction_depot_cache.get(station_id)) is None:
+            rows = self.execute(
+                f"SELECT item_id, required, provided, payment, complete, modified"
+                f" FROM {DEPOT_TABLE} WHERE station_id = ?", (station_id,)
+            ).fetchall()
+            if not rows:
+                return None
+            state = DepotState(
+                timestamp = max(row[-1] for row in rows),
+                commodities = {row[0]: DepotCommodity(*row[1:4], bool(row[4])) for row in rows},
+            )
+            self.construction_depot_cache[station_id] = state
+            self.touch("construction_depot_cache", station_id)
+        row = self.execute(
+            f"SELECT modified FROM {FINGERPRINT_TABLE} WHERE station_id = ? AND service = ?", (station_id, "depot")
+        ).fetchone()
+        (modified,) = self.execute(
+            "SELECT max(modified) FROM StationItem WHERE station_id = ?", (station_id,)
+        ).fetchone()
+        if row is None or row[0] != modified:
+            self.logger.info(f"depot rows changed since {state.timestamp}, rewrite, market id: {station_id}")
+            return None
+        return state
+
+    def save_depot_state(
+            self: Self, station: Station, commodities: dict[int, DepotCommodity],
+            changed: dict[int, DepotCommodity], removed: set[int], full: bool = False,
+    ) -> None:
+        if not self.side_tables:
+            return
+        if full:
+            self.execute(f"DELETE FROM {DEPOT_TABLE} WHERE station_id = ?", (station.station_id,))
+        if removed:
+            self.execute(
+                f"DELETE FROM {DEPOT_TABLE} WHERE station_id = ? AND item_id = ?",
+                [(station.station_id, item_id) for item_id in removed], many=True
+            )
+        if changed:
+            self.execute(
+                f"REPLACE INTO {DEPOT_TABLE} VALUES(?,?,?,?,?,?,?)",
+                [
+                    (station.station_id, item_id, *commodity[:3], int(commodity.complete), self.timestamp)
+                    for item_id, commodity in changed.items()
+                ],
+                many=True
+            )
+        self.construction_depot_cache[station.station_id] = DepotState(self.timestamp, commodities)
+        self.touch("construction_depot_cache", station.station_id)
@@ -0,0 +1,243 @@
+import logging
+import queue
+import threading
+import time
+
+from collections import Counter, deque
+from typing import Self, Any
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+from .tradedb import TradeDB
+from .maintenance import Maintenance
+
+
+@dataclass
+class EventStats:
+    """Latency statistics of one event type."""
+    count: int = 0
+    failed: int = 0
+    wait_ms: float = 0.0
+    run_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    max_run_ms: float = 0.0
+    last_run_ms: float = 0.0
+
+    def add(self: Self, wait_ms: float, run_ms: float, ok: bool) -> None:
+        self.count += 1
+        if not ok:
+            self.failed += 1
+        self.wait_ms += wait_ms
+        self.run_ms += run_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.max_run_ms = max(self.max_run_ms, run_ms)
+        self.last_run_ms = run_ms
+
+    @property
+    def avg_wait_ms(self: Self) -> float:
+        return self.wait_ms / self.count if self.count else 0.0
+
+    @property
+    def avg_run_ms(self: Self) -> float:
+        return self.run_ms / self.count if self.count else 0.0
+
+    def __str__(self: Self) -> str:
+        return (
+            f"count: {self.count}, failed: {self.failed}"
+            f", wait avg/max: {self.avg_wait_ms:.1f}/{self.max_wait_ms:.1f} ms"
+            f", run avg/max/last: {self.avg_run_ms:.1f}/{self.max_run_ms:.1f}/{self.last_run_ms:.1f} ms"
+        )
+
+
+class TradeDBWriter(threading.Thread):
+    """Writer thread, the only user of the TradeDB connection once started."""
+
+    def __init__(
+        self: Self, tdb: TradeDB, logger: logging.Logger, maxsize: int = 0, name: str = "UpdateTD-Writer",
+        maintenance: Maintenance | None = None, coalesce_ms: int = 0
+    ):
+        super().__init__(name=name, daemon=True)
+        self.tdb = tdb
+        self.logger = logger
+        self.maintenance = maintenance
+        # the bound applies to events only, see submit_control()
+        self.maxsize = maxsize
+        self.queue: queue.Queue[tuple | None] = queue.Queue()
+        self.stats: dict[str, EventStats] = {}
+        self.stats_lock = threading.Lock()
+        self.stopping = False
+        # events not queued because the queue was full
+        self.dropped = 0
+        # enqueue time of the running job, None while idle
+        self.running_since: float | None = None
+        # key -> queued slot [deadline, job], see submit_coalesced()
+        self.coalesce_s = coalesce_ms / 1000
+        self.pending: dict[Hashable, list] = {}
+        self.pending_lock = threading.Lock()
+        # (key, slot) taken from the queue, waiting for the end of their window
+        self.held: deque[tuple[Hashable, list]] = deque()
+        # jobs replaced by a newer one with the same key
+        self.coalesced = 0
+
+    @property
+    def queue_depth(self: Self) -> int:
+        return self.queue.qsize() + len(self.held)
+
+    @property
+    def lag_ms(self: Self) -> float:
+        """age of the running job, every queued job is younger"""
+        running_since = self.running_since
+        return 0.0 if running_since is None else (time.perf_counter() - running_since) * 1000
+
+    def submit(self: Self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """queue a job, never blocks: with a bounded queue the job is dropped if the queue is full"""
+        return self._put(name, (name, time.perf_counter(), func, args, kwargs))
+
+    def submit_control(self: Self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """queue a job which is never dropped by a full queue, e.g. connecting or new settings"""
+        return self._put(name, (name, time.perf_counter(), func, args, kwargs), bounded=False)
+
+    def submit_coalesced(
+        self: Self, key: Hashable, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> bool:
+        """
+        queue a job which is run after the coalescing window; a job with the
+        same key submitted until then replaces it, keeping its position among
+        the keyed jobs. Jobs without a key do not wait for the window.
+        """
+        if not self.coalesce_s:
+            return self.submit(name, func, *args, **kwargs)
+        enqueued = time.perf_counter()
+        job = (name, enqueued, func, args, kwargs)
+        with self.pending_lock:
+            if (slot := self.pending.get(key)) is not None:
+                slot[1] = job
+                self.coalesced += 1
+                self.logger.debug(f"writer {name} {key} coalesced")
+                return True
+            self.pending[key] = slot = [enqueued + self.coalesce_s, job]
+        if not self._put(name, (key, slot)):
+            with self.pending_lock:
+                self.pending.pop(key, None)
+            return False
+        return True
+
+    def _put(self: Self, name: str, item: tuple, bounded: bool = True) -> bool:
+        if self.stopping or not self.is_alive():
+            self.logger.warning(f"writer not running, {name} dropped")
+            return False
+        if bounded and 0 < self.maxsize <= self.queue_depth:
+            self.dropped += 1
+            self.logger.warning(f"writer queue full, {name} dropped ({self.dropped} total)")
+            return False
+        self.queue.put_nowait(item)
+        return True
+
+    def _take_due(self: Self, flush: bool = False) -> tuple | None:
+        """the newest job of the first held key once its window ended (or at once with flush)"""
+        with self.pending_lock:
+            if not self.held or (not flush and self.held[0][1][0] > time.perf_counter()):
+                return None
+            key, slot = self.held.popleft()
+            self.pending.pop(key, None)
+            return slot[1]
+
+    def run(self: Self) -> None:
+        self.logger.info("writer started")
+        idle_s = self.maintenance.idle_s if self.maintenance else None
+        while True:
+            if job := self._take_due():
+                self._run_queued(job)
+                continue
+            timeout = idle_s
+            if self.held:
+                # the deadlines of the held slots are in queue order
+                timeout = max(0.0, self.held[0][1][0] - time.perf_counter())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                if not self.held and self.maintenance:
+                    self.maintenance.on_idle()
+                continue
+            self.queue.task_done()
+            if item is None:
+                # stopping, the held jobs run without waiting for their window
+                while job := self._take_due(flush=True):
+                    self._run_queued(job)
+                break
+            if len(item) == 2:
+                # (key, slot) of submit_coalesced(), held while other jobs run
+                with self.pending_lock:
+                    self.held.append(item)
+                continue
+            self._run_queued(item)
+        if self.maintenance:
+            self.maintenance.on_stop()
+        self.logger.info("writer stopped")
+
+    def _run_queued(self: Self, job: tuple) -> None:
+        self._run_job(*job)
+        if self.maintenance:
+            self.maintenance.after_job()
+
+    def _run_job(
+        self: Self, name: str, enqueued: float, func: Callable[..., Any],
+        args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> None:
+        started = time.perf_counter()
+        self.running_since = enqueued
+        ok = True
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            ok = False
+            self.logger.exception(f"{name} failed")
+        finally:
+            self.running_since = None
+        finished = time.perf_counter()
+        with self.stats_lock:
+            if name not in self.stats:
+                self.stats[name] = EventStats()
+            self.stats[name].add((started - enqueued) * 1000, (finished - started) * 1000, ok)
+
+    def get_stats(self: Self) -> dict[str, EventStats]:
+        with self.stats_lock:
+            return {name: EventStats(**vars(stats)) for name, stats in self.stats.items()}
+
+    def log_stats(self: Self) -> None:
+        self.logger.info(
+            f"writer queue depth: {self.queue_depth}, dropped: {self.dropped}, coalesced: {self.coalesced}"
+        )
+        for name, stats in sorted(self.get_stats().items()):
+            self.logger.info(f"writer {name}: {stats}")
+
+    def queued_jobs(self: Self) -> Counter[str]:
+        """names of the jobs still queued"""
+        with self.queue.mutex:
+            items = list(self.queue.queue)
+        with self.pending_lock:
+            items.extend(self.held)
+        # (key, slot) of submit_coalesced() or (name, enqueued, func, args, kwargs)
+        return Counter(item[1][1][0] if len(item) == 2 else item[0] for item in items if item is not None)
+
+    def request_stop(self: Self) -> None:
+        """Stop accepting jobs, the thread ends after the queued ones."""
+        if self.stopping:
+            return
+        self.stopping = True
+        # draining the queue must not wait for locks over and over
+        self.tdb.cancel_retries.set()
+        if self.is_alive():
+            self.queue.put_nowait(None)
+
+    def stop(self: Self, timeout: float | None = None) -> None:
+        """Drain the queue and stop the thread."""
+        self.request_stop()
+        if self.is_alive():
+            self.join(timeout)
+            if self.is_alive():
+                pending = ", ".join(f"{name}: {count}" for name, count in sorted(self.queued_jobs().items()))
+                self.logger.warning(
+                    f"writer did not stop, running since {self.lag_ms:.0f} ms, not done: {pending or '-'}"
+                )
+        self.log_stats()